@@ -3,16 +3,28 @@ Flask Web Uygulaması - Modern Arayüz
 Tüm modellerin sonuçlarını gösterir, en iyi modeli vurgular.
 Kullanıcılar bir CSV dosyası yükleyerek tüm modellerden tahmin alabilirler.
 """
+import io
 import os
 import json
-from flask import Flask, request, jsonify, render_template_string
+import tempfile
+import numpy as np
+from flask import Flask, Request, request, jsonify, render_template_string
 from werkzeug.utils import secure_filename
 from pathlib import Path
 
-from config import UPLOAD_DIR, TRAINED_MODELS_DIR
+from config import UPLOAD_DIR, TRAINED_MODELS_DIR, UPLOAD_SPILL_THRESHOLD
 from predictor import Predictor
 
+
+class SpooledUploadRequest(Request):
+    """Keeps uploaded files in memory, spilling to an anonymous temp file only above UPLOAD_SPILL_THRESHOLD"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPILL_THRESHOLD, mode='w+b', dir=UPLOAD_DIR)
+
+
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 app.config['UPLOAD_FOLDER'] = UPLOAD_DIR
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -581,8 +593,8 @@ HTML_TEMPLATE = """
 
 try:
     predictor = Predictor()
-    print("All models loaded successfully.")
     print(f"Available models: {list(predictor.models.keys())}")
+    print(f"Resident models: {predictor.models.resident()}")
     print(f"Best model: {predictor.best_model_name}")
 except FileNotFoundError as e:
     print(f"FATAL ERROR: {e}")
@@ -601,40 +613,82 @@ def upload_file():
         else:
             file = request.files['file']
             if file and file.filename.endswith('.csv'):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                
-                prediction_result = predictor.predict(filepath)
+                # Yükleme akışı doğrudan chunk'lı CSV okumasına verilir (diske kaydedilmez)
+                prediction_result = predictor.predict(file.stream, file_name=secure_filename(file.filename))
                 if "error" not in prediction_result:
                     result = prediction_result
                 else:
                     error = prediction_result["error"]
-                    
-                os.remove(filepath)
             else:
                 error = "Invalid file type. Please upload a .csv file."
             
     return render_template_string(HTML_TEMPLATE, result=result, error=error)
 
+# /api/predict gövdesinde doğrudan kabul edilen ham dizi biçimleri (CSV kodlama/çözme maliyeti olmadan)
+RAW_ARRAY_DTYPES = {'float64': '<f8', 'float32': '<f4'}
+
+def _series_from_body():
+    """(values, error) for JSON / raw little-endian float / .npy request bodies; (None, None) for multipart uploads"""
+    mimetype = request.mimetype
+    if mimetype == 'application/json':
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict): payload = payload.get('data')
+        try:
+            values = np.asarray(payload, dtype=np.float64)
+        except (TypeError, ValueError):
+            return None, "JSON body must be an array of numbers or an object with a 'data' array."
+    elif mimetype == 'application/octet-stream':
+        # Ham little-endian değerler; tür ?dtype=float32 veya 'application/octet-stream; dtype=float32' ile seçilir
+        dtype = RAW_ARRAY_DTYPES.get(request.mimetype_params.get('dtype') or request.args.get('dtype', 'float64'))
+        body = request.get_data(cache=False)
+        if dtype is None:
+            return None, f"Unsupported dtype (expected one of: {', '.join(RAW_ARRAY_DTYPES)})."
+        if len(body) % np.dtype(dtype).itemsize:
+            return None, "Body length is not a multiple of the dtype size."
+        values = np.frombuffer(body, dtype=dtype)
+    elif mimetype == 'application/x-npy':
+        try:
+            values = np.load(io.BytesIO(request.get_data(cache=False)), allow_pickle=False)
+        except ValueError as e:
+            return None, f"Invalid .npy payload: {e}"
+    else:
+        return None, None
+    if values.ndim != 1 or len(values) < 2 or values.dtype.kind not in 'fiu':
+        return None, "Series must be a one-dimensional numeric array with at least two values."
+    return values, None
+
 @app.route('/api/predict', methods=['POST'])
 def api_predict():
-    """API endpoint for programmatic access"""
+    """API endpoint for programmatic access (multipart CSV/.npy upload, JSON array, raw float64/float32 bytes or .npy body)"""
     if predictor is None:
         return jsonify({"error": "Models not trained or loaded."}), 503
 
-    if 'file' not in request.files:
-        return jsonify({"error": "No file part in the request."}), 400
-    
-    file = request.files['file']
-    if not file or not file.filename.endswith('.csv'):
-        return jsonify({"error": "No selected file or invalid file type (must be .csv)."}), 400
-    
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
-    prediction = predictor.predict(filepath)
-    os.remove(filepath)
+    # İsteğe bağlı model alt kümesi: ?models=xgboost_fast,random_forest
+    models = [name.strip() for name in request.values.get('models', '').split(',') if name.strip()] or None
+    unknown = [name for name in models or [] if name not in predictor.models]
+    if unknown:
+        return jsonify({"error": f"Unknown model(s): {', '.join(unknown)}"}), 400
+
+    values, error = _series_from_body()
+    if error:
+        return jsonify({"error": error}), 400
+    if values is not None:
+        prediction = predictor.predict(values, models=models, file_name=request.args.get('name', 'array'))
+    else:
+        if 'file' not in request.files:
+            return jsonify({"error": "No file part in the request."}), 400
+        file = request.files['file']
+        if not file or not file.filename.endswith(('.csv', '.npy')):
+            return jsonify({"error": "No selected file or invalid file type (must be .csv or .npy)."}), 400
+        file_name = secure_filename(file.filename)
+        if file_name.endswith('.npy'):
+            try:
+                source = np.load(file.stream, allow_pickle=False)
+            except ValueError as e:
+                return jsonify({"error": f"Invalid .npy file: {e}"}), 400
+        else:
+            source = file.stream
+        prediction = predictor.predict(source, models=models, file_name=file_name)
 
     status_code = 500 if "error" in prediction else 200
     return jsonify(prediction), status_code
@@ -644,7 +698,8 @@ def health_check():
     """Health check endpoint for deployment"""
     return jsonify({
         "status": "healthy" if predictor is not None else "unhealthy",
-        "models_loaded": len(predictor.models) if predictor else 0,
+        "models_available": len(predictor.models) if predictor else 0,
+        "models_loaded": len(predictor.models.resident()) if predictor else 0,
         "best_model": predictor.best_model_name if predictor else None
     })
 
@@ -657,7 +712,7 @@ if __name__ == '__main__':
         print("❌ Web server cannot start due to model loading error.")
         print("💡 Please run 'python main.py' to train models first.")
     else:
-        print(f"✅ {len(predictor.models)} models loaded successfully")
+        print(f"✅ {len(predictor.models)} models available ({len(predictor.models.resident())} loaded)")
         print(f"🏆 Best model: {predictor.best_model_name}")
         print("\n🚀 Starting web server...")
         print("📝 Access the application at: http://localhost:5000")
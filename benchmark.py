@@ -0,0 +1,144 @@
+"""
+Mikro-Benchmark Betiği
+Özellik çıkarımındaki sıcak döngülerin chunk başına maliyetini ölçer.
+Kullanım: python benchmark.py
+"""
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Sequence
+
+from config import CHUNK_SIZE, TRAINED_MODELS_DIR
+from processor import TimeSeriesDataProcessor
+from csv_readers import read_data_column, available_engines
+from quantile_sketch import KLLSketch
+
+
+def _legacy_count_peaks(data: np.ndarray) -> int:
+    """Reference implementation: Python generator over every element"""
+    if len(data) < 3: return 0
+    return sum(1 for i in range(1, len(data) - 1) if data[i] > data[i-1] and data[i] > data[i+1])
+
+
+def _legacy_zero_crossing_rate(data: np.ndarray) -> float:
+    """Reference implementation: np.diff over np.sign"""
+    if len(data) < 2: return 0
+    return np.sum(np.diff(np.sign(data)) != 0) / (len(data) - 1)
+
+
+def time_call(func: Callable, *args, repeats: int = 20) -> float:
+    """Best-of-N wall time of a single call, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_chunk_helpers(chunk_size: int = CHUNK_SIZE, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Compare the vectorized peak / zero-crossing helpers against the legacy loops on one chunk"""
+    rng = np.random.default_rng(seed)
+    data = np.cumsum(rng.normal(size=chunk_size))
+    centered = data - np.mean(data)
+    processor = TimeSeriesDataProcessor(base_path='', chunk_size=chunk_size)
+
+    assert processor._count_peaks(data) == _legacy_count_peaks(data)
+    assert processor._zero_crossing_rate(centered) == _legacy_zero_crossing_rate(centered)
+
+    cases = {
+        'count_peaks': (_legacy_count_peaks, processor._count_peaks, data),
+        'zero_crossing_rate': (_legacy_zero_crossing_rate, processor._zero_crossing_rate, centered),
+    }
+    results = {}
+    for name, (legacy, vectorized, arg) in cases.items():
+        legacy_ms = time_call(legacy, arg, repeats=3)
+        vectorized_ms = time_call(vectorized, arg)
+        results[name] = {'legacy_ms': legacy_ms, 'vectorized_ms': vectorized_ms, 'speedup': legacy_ms / vectorized_ms}
+    results['extract_features_from_chunk'] = {'vectorized_ms': time_call(processor.extract_features_from_chunk, data)}
+    return results
+
+
+def bench_csv_readers(sizes: Sequence[int] = (1000, 10000, 100000), seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Time to parse the 'data' column with every available engine, for single-column files of several lengths"""
+    rng = np.random.default_rng(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            path = os.path.join(tmp_dir, f'series_{size}.csv')
+            pd.DataFrame({'data': np.cumsum(rng.normal(size=size))}).to_csv(path, index=False)
+            reference = read_data_column(path, 'pandas')
+            row = {'kb': os.path.getsize(path) / 1024}
+            for engine in available_engines():
+                # Motorlar son bitte farklı yuvarlayabilir; değerler yine de eşit olmalı
+                assert np.allclose(read_data_column(path, engine), reference, rtol=1e-12)
+                row[f'{engine}_ms'] = time_call(read_data_column, path, engine, repeats=10 if size <= 10000 else 3)
+            results[f'rows={size}'] = row
+    return results
+
+
+def bench_fast_path(model_dir=TRAINED_MODELS_DIR, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Single-row preprocessing + best-model time, sklearn wrappers vs the compiled fast path"""
+    from predictor import Predictor
+    from fast_inference import compile_checked
+    predictor = Predictor(model_dir, fast_inference=False)
+    preprocessor = predictor.preprocessor
+    predictor.preprocessor = None  # sklearn scaler + selector yolu
+    model = predictor.models.get(predictor.best_model_name)
+    matrix = np.random.default_rng(seed).normal(size=(1, predictor.main_scaler.n_features_in_))
+
+    preprocess = preprocessor.transform
+    fast_predict_proba = compile_checked(model, preprocessor.n_features_out)
+    if fast_predict_proba is None:
+        return {}
+    assert np.allclose(fast_predict_proba(preprocess(matrix)), model.predict_proba(predictor.prepare_features(list(matrix))), atol=1e-5)
+
+    sklearn_ms = time_call(lambda: model.predict_proba(predictor.prepare_features(list(matrix))), repeats=200)
+    fast_ms = time_call(lambda: fast_predict_proba(preprocess(matrix)), repeats=200)
+    return {predictor.best_model_name: {'sklearn_ms': sklearn_ms, 'fast_ms': fast_ms, 'speedup': sklearn_ms / fast_ms}}
+
+
+def bench_quantile_sketch(length: int = 1_000_000, ks: Sequence[int] = (50, 200, 800), chunk_size: int = CHUNK_SIZE,
+                          seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Whole-series q25/median/q75: exact np.percentile on the full array vs a KLL sketch fed chunk by chunk"""
+    data = np.cumsum(np.random.default_rng(seed).normal(size=length))
+    qs = np.array([0.25, 0.5, 0.75])
+    sorted_data = np.sort(data)
+
+    def sketch_quantiles(k):
+        sketch = KLLSketch(k)
+        for start in range(0, length, chunk_size): sketch.update(data[start:start + chunk_size])
+        return sketch, sketch.quantiles(qs)
+
+    results = {'exact': {'ms': time_call(np.percentile, data, qs * 100, repeats=5), 'values_held': length}}
+    for k in ks:
+        sketch, estimates = sketch_quantiles(k)
+        # Sıra hatası: tahminin gerçek sırası ile istenen q arasındaki en büyük fark
+        rank_error = np.max(np.abs(np.searchsorted(sorted_data, estimates) / length - qs))
+        results[f'kll k={k}'] = {'ms': time_call(sketch_quantiles, k, repeats=3), 'values_held': sketch.retained,
+                                 'max_rank_error': rank_error}
+    return results
+
+
+def print_results(title: str, results: Dict[str, Dict[str, float]]):
+    print(f"\n{title}")
+    print("-" * 60)
+    for name, stats in results.items():
+        row = ", ".join(f"{key}={value:.3f}" for key, value in stats.items())
+        print(f"{name:<28} {row}")
+
+
+def run_benchmarks():
+    print("--- Benchmark Başladı ---")
+    print_results(f"Chunk helpers (chunk_size={CHUNK_SIZE})", bench_chunk_helpers())
+    print_results("CSV readers ('data' column)", bench_csv_readers())
+    print_results("Whole-series quantiles (1M values)", bench_quantile_sketch())
+    if (TRAINED_MODELS_DIR / 'best_model_info.json').exists():
+        print_results("Best model, single row (preprocessing + predict_proba)", bench_fast_path())
+    print("--- Benchmark Tamamlandı ---")
+
+
+if __name__ == "__main__":
+    run_benchmarks()
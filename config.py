@@ -10,10 +10,64 @@ PROCESSED_DATA_DIR = BASE_DIR / "processed_data"
 TRAINED_MODELS_DIR = BASE_DIR / "trained_models"
 REPORTS_DIR = BASE_DIR / "reports"
 UPLOAD_DIR = BASE_DIR / "uploads" # Flask uygulaması için
+# Yüklemeler bellekte tutulur; bu boyutu aşan yükleme UPLOAD_DIR altında isimsiz geçici dosyaya taşınır
+UPLOAD_SPILL_THRESHOLD = 16 * 1024 * 1024
 
 # --- VERİ İŞLEME PARAMETRELERİ ---
 CHUNK_SIZE = 10000  # Bellek dostu okuma için chunk boyutu
 
+# CSV okuyucu motoru (csv_readers.py): 'pandas' (C motoru, büyük dosyalarda hızlı), 'pyarrow' (pyarrow kurulu olmalı),
+# 'numpy' (np.loadtxt, küçük dosyalarda düşük sabit maliyet) veya 'auto' (CSV_AUTO_NUMPY_MAX_BYTES altı numpy, üstü pandas).
+# Motorlar son bitte farklı float yuvarlaması yapabilir; motor değişince özellik önbelleği yeniden hesaplanır.
+CSV_READER_ENGINE = 'pandas'
+CSV_READER_DTYPE = 'float64'  # Ayrıştırma tipi ('float32' bellek tasarrufu sağlar, hassasiyet kaybıyla)
+CSV_AUTO_NUMPY_MAX_BYTES = 128 * 1024  # benchmark.py: bu makinede ~150 KB civarında pandas öne geçiyor
+
+# Kayan pencere istatistikleri: 'cumsum' (O(n), kümülatif toplamlar) veya 'strided' (kesin, O(n*w) stride görünümü)
+ROLLING_STAT_METHOD = 'cumsum'
+# Kümülatif toplamların yeniden başlatıldığı blok uzunluğu; uzun serilerde yuvarlama hatasını sınırlar
+ROLLING_BLOCK_SIZE = 4096
+
+# True: chunk-toplam özelliklerine ek olarak tüm seri için 'series_*' özellikleri (streaming_features.py) üretilir.
+# Chunk'lar tek geçişte birleştirilebilir yeterli istatistiklerle (momentler, gecikmeli çarpımlar, sınır değerleri)
+# biriktirilir; bellek kullanımı seri uzunluğundan bağımsızdır. Vektör düzeni değiştiği için modellerin yeniden eğitilmesi gerekir.
+SERIES_FEATURES = False
+# Tüm seri yüzdelikleri (series_q25, series_median, series_q75, series_iqr) için KLL sketch boyutu (quantile_sketch.py).
+# Sketch ~k değer tutar; sıra hatası ~1/k (benchmark.py, 1M değer: k=200 -> ~0.5%). None: yüzdelikler üretilmez.
+# Chunk başına kesin yüzdelik özellikleri (q25, median, q75, iqr) bundan etkilenmez.
+SERIES_QUANTILE_SKETCH_K = 200
+
+# Toplu özellik çıkarımı: her paralel görevde işlenecek dosya sayısı.
+# Eşit uzunluktaki seriler (N, L) matrisine dizilip tek seferde işlenir. Dosya başına eski yol için None yapın.
+BATCH_FILES_PER_TASK = 256
+
+# Paralel işçi sayısı; None ise kullanılabilir CPU sayısı kadar işçi başlatılır
+N_WORKERS = None
+# Bir görevdeki dosyaların toplam boyut üst sınırı (byte). Büyük dosyalar kendi görevlerinde kalır,
+# görevler büyükten küçüğe sıralandığı için kuyruk sonunda yavaş kalan işçi olmaz.
+TASK_MAX_BYTES = 64 * 1024 * 1024
+
+# --- ÖZELLİK ÖNBELLEĞİ ---
+# Dosya kimliği (yol + boyut + mtime veya içerik özeti) ve özellik sürümüyle anahtarlanan kalıcı önbellek.
+# Değişmeyen dosyalar tekrar işlenmez.
+FEATURE_CACHE_ENABLED = True
+FEATURE_CACHE_PATH = PROCESSED_DATA_DIR / "feature_cache.sqlite"
+FEATURE_CACHE_KEY = 'mtime'  # 'mtime' (yol + boyut + mtime) veya 'hash' (yol + boyut + içerik özeti)
+FEATURE_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Aşılınca en uzun süredir kullanılmayan kayıtlar silinir; None = sınırsız
+
+# --- ÇIKTI YAZIMI ---
+# True: özellik satırları geldikçe bellek eşlemeli .npy dosyalarına yazılır ve periyodik checkpoint alınır.
+# Yarıda kesilen bir çalıştırma, tekrar başlatıldığında kaldığı yerden devam eder.
+STREAMING_OUTPUT = True
+CHECKPOINT_EVERY_ROWS = 10000  # Kaç satırda bir checkpoint alınacağı
+
+# --- SÜTUNSAL SHARD'LAR ---
+# True: ham CSV derlemi bir kez birkaç büyük shard'a dönüştürülür (shards.py: offsets + values .npy, etiketler, kaynak yolları).
+# Sonraki çalıştırmalar CSV'leri ayrıştırmak yerine shard'ları memory-map ile okur. Ham veri değişirse 'python shards.py' ile yeniden oluşturun.
+USE_SHARDS = False
+SHARD_DIR = PROCESSED_DATA_DIR / "shards"
+SHARD_MAX_BYTES = 256 * 1024 * 1024  # Bir shard'daki değerlerin (float64) üst sınırı
+
 # !!! YENİ EKLENEN AYAR !!!
 # Test için her bir ana klasörden (stationary, collective_anomaly, vb.) alınacak maksimum dosya sayısı.
 # Tüm veriyi işlemek için bu değeri None yapın.
@@ -33,4 +87,40 @@ LABEL_MAP = {
 # --- MODEL EĞİTİM PARAMETRELERİ ---
 TEST_SIZE = 0.2  # Test verisi oranı
 FEATURE_SELECTION_K = 30  # En iyi K adet özellik seçimi
-CROSS_VALIDATION_FOLDS = 5 # Çapraz doğrulama kat sayısı
\ No newline at end of file
+CROSS_VALIDATION_FOLDS = 5 # Çapraz doğrulama kat sayısı
+
+# Out-of-core eğitim: features.npy bellek eşlemeli açılır, bölme indekslerle yapılır,
+# scaler/selector bir satır örneği üzerinde eğitilir ve seçilmiş matrisler bloklar halinde oluşturulur.
+OUT_OF_CORE_TRAINING = False
+PREPROCESS_FIT_SAMPLE_SIZE = 200000  # Scaler/selector (ve çapraz doğrulama) için kullanılacak en fazla satır
+TRAINING_BLOCK_ROWS = 100000  # Blok halinde dönüştürmede bir bloktaki satır sayısı
+
+# Paralel model eğitimi: bağımsız modeller bir süreç havuzunda aynı anda eğitilir.
+# CPU bütçesi (None ise kullanılabilir CPU sayısı) tek iş parçacıklı modellere birer çekirdek,
+# kalanı n_jobs kullanan modeller arasında eşit paylaştırılarak dağıtılır.
+PARALLEL_MODEL_TRAINING = True
+TRAINING_CPU_BUDGET = None
+
+# Model bazında karar eşikleri (eğitim sonunda best_model_info.json'a yazılır, Predictor oradan okur).
+# predict_proba olan modellerde sınıf 1 olasılığı eşiği (varsayılan 0.5),
+# sadece decision_function olan modellerde marjin eşiği (varsayılan 0.0). Örnek: {'lightgbm': 0.45}
+DECISION_THRESHOLDS = {}
+
+# --- ÇIKARIM (INFERENCE) ---
+# True: modeller kalıcı bir iş parçacığı havuzunda aynı anda çalıştırılır (LightGBM/XGBoost/sklearn ağaçları GIL'i bırakır).
+# MODEL_TIMEOUT_SECONDS içinde yanıt vermeyen model, tüm yanıtı bekletmek yerine TIMEOUT olarak döner.
+CONCURRENT_INFERENCE = False
+INFERENCE_THREADS = None  # None: model sayısının iki katı
+MODEL_TIMEOUT_SECONDS = 5.0
+# Modeller ilk kullanımda yüklenir; en iyi model her zaman bellekte tutulur, diğerleri LRU sırasıyla boşaltılır.
+PRELOAD_MODELS = 'best'  # 'best': yalnızca en iyi model, 'all': tüm modeller, 'none': başlangıçta hiçbiri
+MAX_RESIDENT_MODELS = None  # En iyi model hariç bellekte tutulacak en fazla model (None: sınırsız)
+MODEL_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Bellekteki modellerin toplam boyut sınırı (disk boyutu ile tahmin edilir)
+# Modeller sıkıştırılmadan kaydedilir; numpy dizileri (MLP ağırlıkları, doğrusal katsayılar, ölçekleyiciler) joblib ile
+# salt-okunur memory-map olarak açılır, böylece aynı makinedeki worker süreçleri bu sayfaları page cache üzerinden paylaşır.
+# Not: ağaç düğümleri (sklearn Tree) ve LightGBM/XGBoost booster'ları yüklenirken kopyalanır; onlar için gunicorn --preload kullanın.
+MODEL_MMAP_MODE = 'r'  # None: memory-map kapalı
+# En iyi model için derlenmiş hızlı yol (fast_inference.py); ilk kullanımda sklearn yoluna karşı eşlik kontrolünden geçmezse kapatılır
+FAST_INFERENCE = True
+# True: çıkarımda yalnızca seçilen sütunların ihtiyaç duyduğu temel özellikler hesaplanır (feature_plan.json)
+SELECTIVE_FEATURE_EXTRACTION = True
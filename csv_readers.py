@@ -0,0 +1,108 @@
+"""
+CSV Okuyucu Motorları
+Tek 'data' sütunlu seri dosyaları için seçilebilir ayrıştırıcılar: pandas C motoru, pyarrow CSV ve NumPy (np.loadtxt).
+'auto' küçük dosyalarda NumPy'ı (düşük sabit maliyet), büyük dosyalarda pandas'ı seçer; benchmark.py ile ölçülebilir.
+"""
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import IO, Iterator, Union
+
+from config import CSV_READER_ENGINE, CSV_READER_DTYPE, CSV_AUTO_NUMPY_MAX_BYTES
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+CSV_ENGINES = ('pandas', 'pyarrow', 'numpy', 'auto')
+DATA_COLUMN = 'data'
+
+Source = Union[str, Path, IO]
+
+
+def _rewind(source: Source):
+    if hasattr(source, 'seek'): source.seek(0)
+
+
+def _source_size(source: Source) -> int:
+    if isinstance(source, (str, Path)):
+        return os.path.getsize(source)
+    position = source.tell(); size = source.seek(0, os.SEEK_END); source.seek(position)
+    return size - position
+
+
+def _read_pandas(source: Source, dtype: str) -> np.ndarray:
+    return pd.read_csv(source, usecols=[DATA_COLUMN], dtype={DATA_COLUMN: dtype})[DATA_COLUMN].to_numpy()
+
+
+def _read_pyarrow(source: Source, dtype: str) -> np.ndarray:
+    if pa_csv is None:
+        raise ImportError("CSV engine 'pyarrow' requires the pyarrow package.")
+    options = pa_csv.ConvertOptions(include_columns=[DATA_COLUMN], column_types={DATA_COLUMN: pa.from_numpy_dtype(np.dtype(dtype))})
+    column = pa_csv.read_csv(source, convert_options=options).column(DATA_COLUMN)
+    # Boş hücreler (null) NaN olur, pandas ile aynı
+    return column.to_numpy()
+
+
+def _read_numpy(source: Source, dtype: str) -> np.ndarray:
+    """np.loadtxt on the 'data' column; files with empty cells fall back to pandas (loadtxt cannot represent them)"""
+    handle = open(source, 'rb') if isinstance(source, (str, Path)) else source
+    try:
+        header = handle.readline()
+        header = (header.decode('utf-8-sig') if isinstance(header, bytes) else header).strip().split(',')
+        if DATA_COLUMN not in header:
+            raise ValueError(f"Column '{DATA_COLUMN}' not found in CSV header.")
+        try:
+            return np.loadtxt(handle, delimiter=',', usecols=header.index(DATA_COLUMN), dtype=dtype, ndmin=1)
+        except ValueError:
+            _rewind(handle)
+            return _read_pandas(handle, dtype)
+    finally:
+        if handle is not source: handle.close()
+
+
+_READERS = {'pandas': _read_pandas, 'pyarrow': _read_pyarrow, 'numpy': _read_numpy}
+
+
+def check_engine(engine: str):
+    """Fail early on an unknown engine name or a missing optional dependency"""
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}' (expected one of: {', '.join(CSV_ENGINES)}).")
+    if engine == 'pyarrow' and pa_csv is None:
+        raise ImportError("CSV engine 'pyarrow' requires the pyarrow package.")
+
+
+def available_engines():
+    return [engine for engine in _READERS if engine != 'pyarrow' or pa_csv is not None]
+
+
+def resolve_engine(source: Source, engine: str = CSV_READER_ENGINE) -> str:
+    check_engine(engine)
+    if engine != 'auto':
+        return engine
+    try:
+        return 'numpy' if _source_size(source) <= CSV_AUTO_NUMPY_MAX_BYTES else 'pandas'
+    except (OSError, AttributeError):
+        return 'pandas'
+
+
+def read_data_column(source: Source, engine: str = CSV_READER_ENGINE, dtype: str = CSV_READER_DTYPE) -> np.ndarray:
+    """Whole 'data' column of a CSV path or file-like object as a 1-D array (missing values are NaN)"""
+    return _READERS[resolve_engine(source, engine)](source, dtype)
+
+
+def iter_data_chunks(source: Source, chunk_size: int, engine: str = CSV_READER_ENGINE,
+                     dtype: str = CSV_READER_DTYPE) -> Iterator[np.ndarray]:
+    """Consecutive chunk_size-row blocks of the 'data' column (NaN kept; callers drop them per chunk)"""
+    engine = resolve_engine(source, engine)
+    if engine == 'pandas':
+        # pandas okuma sırasında da chunk'lar halinde ilerler, büyük dosyalar belleğe tek seferde alınmaz
+        for chunk in pd.read_csv(source, chunksize=chunk_size, usecols=[DATA_COLUMN], dtype={DATA_COLUMN: dtype}):
+            yield chunk[DATA_COLUMN].to_numpy()
+        return
+    values = _READERS[engine](source, dtype)
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
@@ -0,0 +1,131 @@
+"""
+Hızlı Çıkarım Yolu (Fast Path)
+En iyi model için sklearn sarmalayıcısının doğrulama katmanını atlar: XGBoost ağaçları düz numpy dizilerine derlenir,
+LightGBM için yerel Booster, doğrusal modeller için katsayılar doğrudan kullanılır.
+Her derlenmiş model sklearn yoluna karşı eşlik (parity) kontrolünden geçer.
+"""
+import json
+import numpy as np
+from typing import Callable, Optional
+
+from sklearn.linear_model import LogisticRegression
+from lightgbm import LGBMClassifier
+from xgboost import XGBClassifier
+
+ProbaFunction = Callable[[np.ndarray], np.ndarray]
+PARITY_TOLERANCE = 1e-5
+
+
+def _binary_proba(positive: np.ndarray) -> np.ndarray:
+    return np.column_stack([1.0 - positive, positive])
+
+
+def _compile_xgboost(model: XGBClassifier) -> Optional[ProbaFunction]:
+    """Flatten the booster's trees into padded (n_trees, n_nodes) arrays evaluated level by level"""
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    booster = learner['gradient_booster']
+    if learner['objective']['name'] != 'binary:logistic' or booster['name'] != 'gbtree':
+        return None
+    trees = booster['model']['trees']
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        trees = trees[:booster['model']['iteration_indptr'][best_iteration + 1]]
+    if any(any(tree['split_type']) for tree in trees):
+        return None  # kategorik bölmeler desteklenmiyor
+
+    n_trees, n_nodes = len(trees), max(len(tree['left_children']) for tree in trees)
+    feature = np.zeros((n_trees, n_nodes), dtype=np.intp)
+    threshold = np.zeros((n_trees, n_nodes), dtype=np.float32)
+    left = np.tile(np.arange(n_nodes), (n_trees, 1))
+    right = left.copy()
+    default_left = np.zeros((n_trees, n_nodes), dtype=bool)
+    value = np.zeros((n_trees, n_nodes), dtype=np.float64)
+    depth = 0
+    for t, tree in enumerate(trees):
+        children_l = np.asarray(tree['left_children']); children_r = np.asarray(tree['right_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        internal = children_l != -1
+        nodes = np.arange(len(children_l))
+        # Yapraklar kendilerine işaret eder, böylece sabit sayıda adım sonunda her satır bir yaprakta durur
+        feature[t, nodes] = np.where(internal, tree['split_indices'], 0)
+        threshold[t, nodes] = conditions
+        left[t, nodes] = np.where(internal, children_l, nodes)
+        right[t, nodes] = np.where(internal, children_r, nodes)
+        default_left[t, nodes] = np.asarray(tree['default_left'], dtype=bool)
+        value[t, nodes] = np.where(internal, 0.0, conditions)
+        node_depth = np.zeros(len(nodes), dtype=int)
+        for node in nodes[internal]:  # düğümler ebeveynlerinden sonra numaralanır
+            node_depth[children_l[node]] = node_depth[children_r[node]] = node_depth[node] + 1
+        depth = max(depth, int(node_depth.max()))
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    base_margin = np.log(base_score / (1.0 - base_score))
+    offsets = np.arange(n_trees) * n_nodes
+    feature, threshold, left, right, default_left, value = (a.ravel() for a in (feature, threshold, left, right, default_left, value))
+
+    def predict_proba(X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        position = np.broadcast_to(offsets, (len(X), n_trees))
+        for _ in range(depth):
+            x = np.take_along_axis(X, feature[position], axis=1)
+            go_left = np.where(np.isnan(x), default_left[position], x < threshold[position])
+            position = offsets + np.where(go_left, left[position], right[position])
+        margin = base_margin + value[position].sum(axis=1)
+        return _binary_proba(1.0 / (1.0 + np.exp(-margin)))
+    return predict_proba
+
+
+def _compile_lightgbm(model: LGBMClassifier) -> Optional[ProbaFunction]:
+    """LightGBM's native Booster without the sklearn wrapper's input validation"""
+    if len(model.classes_) != 2:
+        return None
+    booster = model.booster_
+
+    def predict_proba(X: np.ndarray) -> np.ndarray:
+        return _binary_proba(booster.predict(X, validate_features=False))
+    return predict_proba
+
+
+def _compile_linear(model: LogisticRegression) -> Optional[ProbaFunction]:
+    if model.coef_.shape[0] != 1:
+        return None
+    coef, intercept = model.coef_.ravel(), float(model.intercept_[0])
+
+    def predict_proba(X: np.ndarray) -> np.ndarray:
+        return _binary_proba(1.0 / (1.0 + np.exp(-(X @ coef + intercept))))
+    return predict_proba
+
+
+def compile_model(model) -> Optional[ProbaFunction]:
+    """predict_proba-equivalent function that bypasses the sklearn wrapper; None if the model type has no fast path"""
+    if isinstance(model, XGBClassifier):
+        return _compile_xgboost(model)
+    if isinstance(model, LGBMClassifier):
+        return _compile_lightgbm(model)
+    if isinstance(model, LogisticRegression):
+        return _compile_linear(model)
+    return None
+
+
+def check_parity(model, predict_proba: ProbaFunction, n_features: int, n_rows: int = 256, seed: int = 0) -> float:
+    """Largest absolute probability difference between the compiled function and model.predict_proba on random probe rows"""
+    rng = np.random.default_rng(seed)
+    probe = rng.normal(scale=3.0, size=(n_rows, n_features))
+    probe[rng.random(probe.shape) < 0.02] = np.nan if not isinstance(model, LogisticRegression) else 0.0
+    return float(np.max(np.abs(predict_proba(probe) - model.predict_proba(probe))))
+
+
+def compile_checked(model, n_features: int, tolerance: float = PARITY_TOLERANCE) -> Optional[ProbaFunction]:
+    """compile_model() guarded by check_parity(); falls back to None (sklearn path) on any mismatch or error"""
+    try:
+        predict_proba = compile_model(model)
+        if predict_proba is None:
+            return None
+        error = check_parity(model, predict_proba, n_features)
+    except Exception as e:
+        print(f"Fast path unavailable for {type(model).__name__}: {e}")
+        return None
+    if not error <= tolerance:
+        print(f"Fast path disabled for {type(model).__name__}: parity error {error:.2e} > {tolerance:.0e}")
+        return None
+    return predict_proba
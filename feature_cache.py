@@ -0,0 +1,103 @@
+"""
+Time Series Stationarity Classification - Persistent Feature Cache
+On-disk store of per-file feature vectors so unchanged CSVs skip extraction
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import FEATURE_CACHE_PATH, FEATURE_CACHE_MAX_BYTES, FEATURE_CACHE_KEY
+
+
+def file_identity(file_path: Path, key: str = FEATURE_CACHE_KEY) -> Optional[Tuple[str, int, int, str]]:
+    """(path, size, mtime_ns, content digest) of a file; the digest is only computed when key == 'hash'"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    digest = ''
+    if key == 'hash':
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+    return str(Path(file_path).resolve()), stat.st_size, stat.st_mtime_ns, digest
+
+
+class FeatureCache:
+    """SQLite-backed cache of feature vectors keyed by file identity and feature-extractor version.
+
+    Files whose extraction failed are stored with a NULL vector so unchanged broken files are not retried.
+    """
+
+    def __init__(self, db_path: Path = FEATURE_CACHE_PATH, version: str = '', max_bytes: Optional[int] = FEATURE_CACHE_MAX_BYTES,
+                 key: str = FEATURE_CACHE_KEY):
+        self.db_path = Path(db_path)
+        self.version = version
+        self.max_bytes = max_bytes
+        self.key = key
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS features (
+            path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, version TEXT,
+            features BLOB, nbytes INTEGER, last_access REAL)''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON features (last_access)')
+        self.conn.commit()
+
+    def get_many(self, identities: List[Tuple[str, int, int, str]]) -> Dict[str, object]:
+        """Map path -> cached feature vector (or None for cached failures) for every identity that is still valid"""
+        found, touched = {}, []
+        now = time.time()
+        for start in range(0, len(identities), 500):
+            block = {identity[0]: identity for identity in identities[start:start + 500]}
+            placeholders = ','.join('?' * len(block))
+            rows = self.conn.execute(
+                f'SELECT path, size, mtime_ns, digest, version, features FROM features WHERE path IN ({placeholders})',
+                list(block)).fetchall()
+            for path, size, mtime_ns, digest, version, blob in rows:
+                _, cur_size, cur_mtime, cur_digest = block[path]
+                if version != self.version or size != cur_size:
+                    continue
+                # İçerik özeti kullanılıyorsa mtime değişikliği (ör. kopyalama) önbelleği geçersiz kılmaz
+                if (cur_digest and digest != cur_digest) or (not cur_digest and mtime_ns != cur_mtime):
+                    continue
+                found[path] = None if blob is None else np.frombuffer(blob, dtype=np.float64).copy()
+                touched.append((now, path))
+        if touched:
+            self.conn.executemany('UPDATE features SET last_access = ? WHERE path = ?', touched)
+            self.conn.commit()
+        return found
+
+    def put_many(self, entries: List[Tuple[Tuple[str, int, int, str], Optional[np.ndarray]]]):
+        """Store (identity, feature vector or None) pairs"""
+        now = time.time()
+        rows = []
+        for (path, size, mtime_ns, digest), vector in entries:
+            blob = None if vector is None else np.ascontiguousarray(vector, dtype=np.float64).tobytes()
+            rows.append((path, size, mtime_ns, digest, self.version, blob, len(blob) if blob else 0, now))
+        self.conn.executemany('INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.conn.commit()
+
+    def evict(self):
+        """Delete least-recently-used rows until the cache fits in max_bytes"""
+        if not self.max_bytes: return
+        # Satır başına sabit ek yük de hesaba katılır (yol metni, indeks)
+        total = self.conn.execute('SELECT COALESCE(SUM(nbytes + LENGTH(path) + 64), 0) FROM features').fetchone()[0]
+        if total <= self.max_bytes: return
+        excess = total - self.max_bytes
+        victims, freed = [], 0
+        for path, nbytes in self.conn.execute('SELECT path, nbytes + LENGTH(path) + 64 FROM features ORDER BY last_access ASC'):
+            victims.append((path,)); freed += nbytes
+            if freed >= excess: break
+        self.conn.executemany('DELETE FROM features WHERE path = ?', victims)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,69 @@
+"""
+Time Series Stationarity Classification - Feature Schema
+Fixed, ordered and versioned column layout of a file feature vector:
+[chunk means of the base features | chunk stds of the base features | optional series_* block].
+A single-chunk file has mean = its chunk features and std = 0, so every file has the same width and column meaning.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Sequence
+
+# Özellik hesaplamasını veya sütun düzenini değiştiren her güncellemede artırılmalı; önbellekteki eski vektörleri,
+# yarım kalmış checkpoint'leri ve eski feature_plan.json dosyalarını geçersiz kılar. Şema sürümü de budur.
+# 2: birleştirilmiş (ortalama, std) çiftleri yerine [ortalamalar | std'ler] blokları; tek chunk'lı dosyalar da tam genişlikte
+# 3: 'cumsum' kayan std blok-yerel merkezleme ile (büyük seviye kaymalarında iptal hatası giderildi)
+FEATURE_EXTRACTOR_VERSION = 3
+
+# İşlenmiş veri dizinine yazılır; trainer.load_data buradan okur
+FEATURE_NAMES_FILENAME = 'feature_names.json'
+
+# extract_features_batch çıktılarındaki özellik sırası
+BASE_FEATURE_NAMES = (
+    'mean', 'std', 'var', 'min', 'max', 'range', 'q25', 'median', 'q75', 'iqr', 'skewness', 'kurtosis', 'cv',
+    'diff1_mean', 'diff1_std', 'diff1_var', 'diff2_mean', 'diff2_std',
+    'rolling_mean_std', 'rolling_std_mean', 'rolling_std_std',
+    'autocorr_lag1', 'autocorr_lag10', 'num_peaks', 'zero_crossing_rate',
+)
+# Özellik adı -> sütun; çekirdek her özelliği önceden ayrılmış dizideki sabit sütununa yazar
+BASE_FEATURE_INDEX = {name: i for i, name in enumerate(BASE_FEATURE_NAMES)}
+
+
+class FeatureSchema:
+    """Column layout of the vectors produced by TimeSeriesDataProcessor"""
+
+    def __init__(self, series_names: Sequence[str] = (), version: int = FEATURE_EXTRACTOR_VERSION):
+        n_base = len(BASE_FEATURE_NAMES)
+        self.version = version
+        self.mean_columns = slice(0, n_base)
+        self.std_columns = slice(n_base, 2 * n_base)
+        self.series_columns = slice(2 * n_base, 2 * n_base + len(series_names))
+        self.names = tuple(f'{name}_mean' for name in BASE_FEATURE_NAMES) + tuple(f'{name}_std' for name in BASE_FEATURE_NAMES) \
+            + tuple(series_names)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.names)
+
+    def to_dict(self) -> Dict:
+        layout = {block: [columns.start, columns.stop] for block, columns in
+                  (('chunk_mean', self.mean_columns), ('chunk_std', self.std_columns), ('series', self.series_columns))}
+        return {'schema_version': self.version, 'names': list(self.names), 'layout': layout}
+
+    def save(self, output_dir: str) -> Path:
+        path = Path(output_dir) / FEATURE_NAMES_FILENAME
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+def base_feature_index(column: int) -> int:
+    """Base feature a chunk-block column is computed from (-1 for the series block)"""
+    n_base = len(BASE_FEATURE_NAMES)
+    return column % n_base if column < 2 * n_base else -1
+
+
+def load_feature_names(path: Path) -> Dict:
+    """feature_names.json as {'schema_version', 'names', ...}; a bare list from older runs has schema_version None"""
+    with open(path, 'r') as f:
+        state = json.load(f)
+    return state if isinstance(state, dict) else {'schema_version': None, 'names': list(state)}
@@ -0,0 +1,140 @@
+"""
+Time Series Stationarity Classification - Streaming Feature Writer
+Appends feature rows to memory-mapped .npy files with periodic checkpoints so a killed run can resume
+"""
+import os
+import json
+import numpy as np
+from pathlib import Path
+from typing import Set
+
+from config import CHECKPOINT_EVERY_ROWS
+
+COPY_BLOCK_ROWS = 65536
+
+
+class FeatureWriter:
+    """Growable memory-mapped writer for (features, labels, sources) with resumable checkpoints.
+
+    Rows are written to features.partial.npy / labels.partial.npy / sources.partial.txt. Every
+    checkpoint flushes them and records the committed row count in checkpoint.json; rows after the
+    last checkpoint are ignored on resume. finalize() writes features.npy / labels.npy / sources.txt.
+    """
+
+    def __init__(self, output_dir: str, n_features: int, capacity: int, version: str = '',
+                 checkpoint_every: int = CHECKPOINT_EVERY_ROWS):
+        self.output_dir = Path(output_dir)
+        self.n_features = n_features
+        self.version = version
+        self.checkpoint_every = checkpoint_every
+        self.rows = 0
+        self.capacity = 0
+        self.features = None
+        self.labels = None
+        self._sources = None
+        self._since_checkpoint = 0
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._features_path = self.output_dir / 'features.partial.npy'
+        self._labels_path = self.output_dir / 'labels.partial.npy'
+        self._sources_path = self.output_dir / 'sources.partial.txt'
+        self._checkpoint_path = self.output_dir / 'checkpoint.json'
+        self._initial_capacity = max(1, capacity)
+
+    def resume(self) -> Set[str]:
+        """Open (or create) the partial files; returns the source paths already committed by a previous run"""
+        state = None
+        if self._checkpoint_path.exists():
+            with open(self._checkpoint_path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') != self.version or state.get('n_features') != self.n_features \
+                    or not self._features_path.exists() or not self._labels_path.exists():
+                print("Checkpoint does not match the current feature layout, starting over.")
+                state = None
+
+        if state is None:
+            self._open(self._initial_capacity, mode='w+')
+            self._sources = open(self._sources_path, 'w', encoding='utf-8')
+            self.checkpoint()
+            return set()
+
+        self.rows = state['rows']
+        self._open(state['capacity'], mode='r+')
+        # Son checkpoint'ten sonra yazılmış kaynak satırları atılır
+        with open(self._sources_path, 'r', encoding='utf-8') as f:
+            done = [line.rstrip('\n') for _, line in zip(range(self.rows), f)]
+        with open(self._sources_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{path}\n" for path in done)
+        self._sources = open(self._sources_path, 'a', encoding='utf-8')
+        print(f"Resuming from checkpoint: {self.rows} rows already written.")
+        return set(done)
+
+    def _open(self, capacity: int, mode: str):
+        self.capacity = capacity
+        self.features = np.lib.format.open_memmap(self._features_path, mode=mode, dtype=np.float64, shape=(capacity, self.n_features))
+        self.labels = np.lib.format.open_memmap(self._labels_path, mode=mode, dtype=np.int64, shape=(capacity,))
+
+    def ensure_capacity(self, capacity: int):
+        """Grow the partial files (block copy, bounded memory) so at least `capacity` rows fit"""
+        if capacity <= self.capacity: return
+        self.features.flush(); self.labels.flush()
+        old_features, old_labels = self.features, self.labels
+        grown_features_path = self.output_dir / 'features.grow.npy'
+        grown_labels_path = self.output_dir / 'labels.grow.npy'
+        features = np.lib.format.open_memmap(grown_features_path, mode='w+', dtype=np.float64, shape=(capacity, self.n_features))
+        labels = np.lib.format.open_memmap(grown_labels_path, mode='w+', dtype=np.int64, shape=(capacity,))
+        for start in range(0, self.rows, COPY_BLOCK_ROWS):
+            stop = min(start + COPY_BLOCK_ROWS, self.rows)
+            features[start:stop] = old_features[start:stop]; labels[start:stop] = old_labels[start:stop]
+        features.flush(); labels.flush()
+        del old_features, old_labels, features, labels
+        self.features = self.labels = None
+        os.replace(grown_features_path, self._features_path)
+        os.replace(grown_labels_path, self._labels_path)
+        self._open(capacity, mode='r+')
+        self._write_state()
+
+    def append(self, feature_vector: np.ndarray, label: int, source: str):
+        if self.rows >= self.capacity:
+            self.ensure_capacity(max(self.capacity * 2, self.rows + 1))
+        if len(feature_vector) != self.n_features:
+            raise ValueError(f"Feature vector has {len(feature_vector)} values, writer expects {self.n_features}.")
+        self.features[self.rows] = feature_vector
+        self.labels[self.rows] = label
+        self._sources.write(f"{source}\n")
+        self.rows += 1
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Make every appended row durable and record it as committed"""
+        self.features.flush(); self.labels.flush()
+        self._sources.flush(); os.fsync(self._sources.fileno())
+        self._write_state()
+        self._since_checkpoint = 0
+
+    def _write_state(self):
+        state = {'rows': self.rows, 'capacity': self.capacity, 'n_features': self.n_features,
+                 'version': self.version}
+        tmp_path = self._checkpoint_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def finalize(self) -> int:
+        """Write features.npy / labels.npy / sources.txt with exactly the committed rows and remove the partial files"""
+        self.checkpoint()
+        self._sources.close()
+        features = np.lib.format.open_memmap(self.output_dir / 'features.npy', mode='w+', dtype=np.float64, shape=(self.rows, self.n_features))
+        labels = np.lib.format.open_memmap(self.output_dir / 'labels.npy', mode='w+', dtype=np.int64, shape=(self.rows,))
+        for start in range(0, self.rows, COPY_BLOCK_ROWS):
+            stop = min(start + COPY_BLOCK_ROWS, self.rows)
+            features[start:stop] = self.features[start:stop]; labels[start:stop] = self.labels[start:stop]
+        features.flush(); labels.flush()
+        del features, labels
+        self.features = self.labels = None
+        os.replace(self._sources_path, self.output_dir / 'sources.txt')
+        for path in (self._features_path, self._labels_path, self._checkpoint_path):
+            os.remove(path)
+        return self.rows
@@ -0,0 +1,95 @@
+"""
+Model Kayıt Defteri (Registry)
+Modelleri ilk kullanımda yükler, sabitlenmiş modelleri (ör. en iyi model) bellekte tutar,
+diğerlerini sayı ve bellek sınırına göre LRU sırasıyla boşaltır.
+"""
+import os
+import threading
+import joblib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from config import MAX_RESIDENT_MODELS, MODEL_CACHE_MAX_BYTES
+
+
+class ModelRegistry:
+    """Lazily loaded models with a bounded, LRU-evicted resident set"""
+
+    def __init__(self, model_dir: Path, pinned: Iterable[str] = (), max_resident: Optional[int] = MAX_RESIDENT_MODELS,
+                 max_bytes: Optional[int] = MODEL_CACHE_MAX_BYTES, loader: Callable[[Path], Any] = joblib.load):
+        self.model_dir = Path(model_dir)
+        self.available = {path.stem: path for path in sorted(self.model_dir.glob('*.joblib'))}
+        self.pinned = set(pinned)
+        self.max_resident = max_resident
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._resident = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    def keys(self) -> List[str]:
+        return list(self.available)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.available)
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self.available
+
+    def resident(self) -> List[str]:
+        with self._lock:
+            return list(self._resident)
+
+    def get(self, model_name: str) -> Optional[Any]:
+        """Return the model, loading it on first use; None if it cannot be loaded"""
+        with self._lock:
+            if model_name in self._resident:
+                self._resident.move_to_end(model_name)
+                return self._resident[model_name]
+            path = self.available.get(model_name)
+            if path is None:
+                raise KeyError(f"Unknown model: {model_name}")
+            try:
+                model = self.loader(path)
+            except Exception as e:
+                # Eski davranışla aynı: yüklenemeyen model listeden çıkarılır
+                print(f"Error loading model {model_name}: {e}")
+                del self.available[model_name]
+                return None
+            print(f"Model loaded: {model_name}")
+            self._resident[model_name] = model
+            self._sizes[model_name] = os.path.getsize(path)
+            self._evict(keep=model_name)
+            return model
+
+    def items(self, model_names: Optional[Iterable[str]] = None) -> List[Tuple[str, Any]]:
+        """(name, model) pairs for the requested models (all by default), skipping models that fail to load"""
+        names = self.keys() if model_names is None else list(model_names)
+        unknown = [name for name in names if name not in self.available]
+        if unknown:
+            raise ValueError(f"Unknown model(s): {', '.join(unknown)}")
+        pairs = []
+        for name in names:
+            model = self.get(name)
+            if model is not None: pairs.append((name, model))
+        return pairs
+
+    def preload(self, model_names: Optional[Iterable[str]] = None):
+        self.items(model_names)
+
+    def _evict(self, keep: str):
+        """Drop least-recently-used unpinned models above the count / memory limits (disk size approximates memory)"""
+        def over_limit():
+            unpinned = [name for name in self._resident if name not in self.pinned]
+            too_many = self.max_resident is not None and len(unpinned) > self.max_resident
+            too_big = self.max_bytes is not None and sum(self._sizes[name] for name in self._resident) > self.max_bytes
+            return (too_many or too_big) and any(name != keep for name in unpinned)
+
+        while over_limit():
+            victim = next(name for name in self._resident if name not in self.pinned and name != keep)
+            del self._resident[victim]
+            del self._sizes[victim]
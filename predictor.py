@@ -5,19 +5,36 @@ En iyi modeli vurgular, tüm model sonuçlarını gösterir.
 """
 import pandas as pd
 import numpy as np
-import joblib
+import io
 import json
-import pickle
+import joblib
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union, IO
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from config import TRAINED_MODELS_DIR, CHUNK_SIZE, LABEL_MAP
-from processor import TimeSeriesDataProcessor
+from config import (TRAINED_MODELS_DIR, CHUNK_SIZE, LABEL_MAP, ROLLING_STAT_METHOD,
+                    CONCURRENT_INFERENCE, INFERENCE_THREADS, MODEL_TIMEOUT_SECONDS, PRELOAD_MODELS,
+                    MODEL_MMAP_MODE, FAST_INFERENCE, SELECTIVE_FEATURE_EXTRACTION)
+from processor import TimeSeriesDataProcessor, required_base_features, FEATURE_EXTRACTOR_VERSION, FEATURE_PLAN_FILENAME
+from model_registry import ModelRegistry
+from fast_inference import compile_checked
+from preprocessing import FusedPreprocessor, PREPROCESSING_FILENAME
 
 class Predictor:
-    def __init__(self, model_dir: Path = TRAINED_MODELS_DIR):
+    def __init__(self, model_dir: Path = TRAINED_MODELS_DIR, concurrent_inference: bool = CONCURRENT_INFERENCE,
+                 model_timeout: float = MODEL_TIMEOUT_SECONDS, preload: str = PRELOAD_MODELS, mmap_mode: Optional[str] = MODEL_MMAP_MODE,
+                 fast_inference: bool = FAST_INFERENCE, selective_extraction: bool = SELECTIVE_FEATURE_EXTRACTION):
         self.model_dir = model_dir
+        self.fast_inference = fast_inference
+        self._fast_models = {}
+        self.concurrent_inference = concurrent_inference
+        self.model_timeout = model_timeout
+        self._executor = None
+        # Süresi dolduğu halde hâlâ çalışan çağrılar (model adı -> future); bitene kadar o model yeniden gönderilmez
+        self._running_after_timeout = {}
+        self._timeout_lock = threading.Lock()
         if not (self.model_dir / 'best_model_info.json').exists():
             raise FileNotFoundError(f"Best model info not found in {self.model_dir}. Please train models first.")
         
@@ -26,128 +43,290 @@ class Predictor:
             best_model_info = json.load(f)
         self.best_model_name = best_model_info['best_model']
         self.best_model_score = best_model_info.get('best_score', 0.0)
+        # Eğitim sırasında kaydedilen model bazlı karar eşikleri (eski modellerde yoksa varsayılanlar kullanılır)
+        self.decision_thresholds = best_model_info.get('decision_thresholds') or {}
         
-        # Tüm modelleri yükle
-        self.models = {}
-        self.load_all_models()
+        # Modeller ilk kullanımda yüklenir; en iyi model bellekte sabitlenir
+        # mmap_mode ile numpy yükleri worker süreçleri arasında page cache üzerinden paylaşılır
+        self.models = ModelRegistry(self.model_dir, pinned=[self.best_model_name], loader=lambda path: joblib.load(path, mmap_mode=mmap_mode))
+        if preload == 'all':
+            self.load_all_models()
+        elif preload == 'best' and self.best_model_name in self.models:
+            self.models.preload([self.best_model_name])
         
         # Ön işleme araçlarını yükle
-        with open(self.model_dir / 'scalers.pkl', 'rb') as f:
-            self.scalers = pickle.load(f)
+        self.scalers = joblib.load(self.model_dir / 'scalers.pkl', mmap_mode=mmap_mode)
         
         self.main_scaler = self.scalers.get('main')
         self.selector = self.scalers.get('selector')
-        self.feature_extractor = TimeSeriesDataProcessor(base_path='', chunk_size=CHUNK_SIZE)
+        # Eğitimin ürettiği birleşik ön işleme (seçilen sütunlar + center/scale); eski model dizinlerinde scalers.pkl'dan türetilir
+        if (self.model_dir / PREPROCESSING_FILENAME).exists():
+            self.preprocessor = FusedPreprocessor.load(self.model_dir / PREPROCESSING_FILENAME)
+        else:
+            self.preprocessor = FusedPreprocessor.from_transformers(self.main_scaler, self.selector)
+        self.feature_plan = self.load_feature_plan() if selective_extraction else None
+        self.feature_extractor = TimeSeriesDataProcessor(base_path='', chunk_size=CHUNK_SIZE, rolling_method=ROLLING_STAT_METHOD,
+                                                         feature_plan=self.feature_plan)
+        # Modeller şemanın ilk n sütunuyla eğitilmiş olmalı (eski 25 sütunlu modeller: chunk ortalamaları bloğu)
+        trained_names = best_model_info.get('feature_names')
+        if trained_names and list(self.feature_extractor.schema.names[:len(trained_names)]) != list(trained_names):
+            print("Warning: models were trained on a different feature schema than the current extractor produces.")
         self.inverse_label_map = {v: k for k, v in LABEL_MAP.items()}
+        # Önceden yüklenen en iyi model için hızlı yol ilk istekten önce derlenir
+        if self.best_model_name in self.models.resident():
+            self._fast_path(self.best_model_name, self.models.get(self.best_model_name), self.prepare_features([np.zeros(self.feature_extractor.schema.n_features)]).shape[1])
+
+    def load_feature_plan(self) -> Optional[List[str]]:
+        """Base features the selected columns depend on (feature_plan.json, else derived from the preprocessing columns)"""
+        plan_path = self.model_dir / FEATURE_PLAN_FILENAME
+        if plan_path.exists():
+            with open(plan_path, 'r') as f:
+                plan = json.load(f)
+            if plan.get('feature_extractor_version') == FEATURE_EXTRACTOR_VERSION:
+                return plan['required_features']
+            print("Feature plan was written by another feature extractor version, deriving it from the preprocessing columns.")
+        return required_base_features(self.preprocessor.columns) if self.preprocessor is not None else None
 
     def load_all_models(self):
         """Tüm eğitilmiş modelleri yükle"""
-        model_files = list(self.model_dir.glob('*.joblib'))
-        
-        for model_file in model_files:
-            model_name = model_file.stem
-            try:
-                model = joblib.load(model_file)
-                self.models[model_name] = model
-                print(f"Model loaded: {model_name}")
-            except Exception as e:
-                print(f"Error loading model {model_name}: {e}")
+        self.models.preload()
 
     def predict_single_model(self, selected_features: np.ndarray, model_name: str, model) -> Dict[str, Any]:
         """Tek bir model için tahmin yap"""
+        return self.predict_model_batch(selected_features, model_name, model)[0]
+
+    def predict_model_batch(self, selected_features: np.ndarray, model_name: str, model) -> List[Dict[str, Any]]:
+        """Tek bir model için tüm satırlara tek çağrıda tahmin yap (satır başına bir sonuç sözlüğü)"""
+        is_best = model_name == self.best_model_name
         try:
-            prediction_idx = model.predict(selected_features)[0]
-            prediction_label = self.inverse_label_map[prediction_idx]
-            
-            # Güven skorları
-            confidence_scores = {}
-            if hasattr(model, 'predict_proba'):
-                probabilities = model.predict_proba(selected_features)[0]
-                confidence_scores = {
-                    self.inverse_label_map[i]: round(float(prob), 4) 
-                    for i, prob in enumerate(probabilities)
-                }
-                max_confidence = round(float(max(probabilities)), 4)
+            # Model tek kez çağrılır: etiket olasılıklardan (veya decision_function skorlarından) eşikle türetilir
+            probabilities = None
+            fast_predict_proba = self._fast_path(model_name, model, selected_features.shape[1])
+            if fast_predict_proba is not None:
+                probabilities = fast_predict_proba(selected_features)
+                prediction_indices = self._labels_from_scores(model, probabilities, self.decision_thresholds.get(model_name, 0.5))
+            elif hasattr(model, 'predict_proba'):
+                probabilities = model.predict_proba(selected_features)
+                prediction_indices = self._labels_from_scores(model, probabilities, self.decision_thresholds.get(model_name, 0.5))
+            elif hasattr(model, 'decision_function'):
+                scores = model.decision_function(selected_features)
+                prediction_indices = self._labels_from_scores(model, scores, self.decision_thresholds.get(model_name, 0.0))
             else:
-                max_confidence = "N/A"
+                prediction_indices = model.predict(selected_features)
             
-            return {
-                "model_name": model_name,
-                "prediction": prediction_label,
-                "confidence_scores": confidence_scores,
-                "max_confidence": max_confidence,
-                "is_best": model_name == self.best_model_name
-            }
+            results = []
+            for row, prediction_idx in enumerate(prediction_indices):
+                confidence_scores = {}
+                max_confidence = "N/A"
+                if probabilities is not None:
+                    confidence_scores = {
+                        self.inverse_label_map[i]: round(float(prob), 4) 
+                        for i, prob in enumerate(probabilities[row])
+                    }
+                    max_confidence = round(float(max(probabilities[row])), 4)
+                results.append({
+                    "model_name": model_name,
+                    "prediction": self.inverse_label_map[prediction_idx],
+                    "confidence_scores": confidence_scores,
+                    "max_confidence": max_confidence,
+                    "is_best": is_best
+                })
+            return results
         except Exception as e:
-            return {
+            return [{
                 "model_name": model_name,
                 "prediction": "ERROR",
                 "error": str(e),
                 "confidence_scores": {},
                 "max_confidence": "N/A",
-                "is_best": model_name == self.best_model_name
-            }
+                "is_best": is_best
+            } for _ in range(len(selected_features))]
 
-    def predict(self, csv_path: str) -> Dict[str, Any]:
-        """Tüm modellerden tahmin al"""
+    def _fast_path(self, model_name: str, model, n_features: int):
+        """Compiled predict_proba for the best model (built and parity-checked on first use), None otherwise"""
+        if not self.fast_inference or model_name != self.best_model_name:
+            return None
+        key = (model_name, id(model))
+        if key not in self._fast_models:
+            self._fast_models[key] = compile_checked(model, n_features)
+            print(f"Fast path for {model_name}: {'enabled' if self._fast_models[key] else 'not available'}")
+        return self._fast_models[key]
+
+    @staticmethod
+    def _labels_from_scores(model, scores: np.ndarray, threshold: float) -> np.ndarray:
+        """Class labels from predict_proba output or decision_function margins (binary: positive-class score > threshold)"""
+        classes = getattr(model, 'classes_', None)
+        if classes is None:
+            classes = np.arange(scores.shape[1] if scores.ndim == 2 else 2)
+        if scores.ndim == 1:
+            return classes[(scores > threshold).astype(int)]
+        if scores.shape[1] == 2:
+            return classes[(scores[:, 1] > threshold).astype(int)]
+        return classes[np.argmax(scores, axis=1)]
+
+    def predict(self, source: Union[str, Path, IO, bytes, np.ndarray], models: Optional[List[str]] = None,
+                file_name: Optional[str] = None) -> Dict[str, Any]:
+        """Tüm modellerden (veya verilen model alt kümesinden) tahmin al.
+
+        source: CSV dosya yolu, CSV içeren dosya benzeri nesne / bytes (diske yazılmadan chunk'lar halinde okunur)
+        veya doğrudan seri değerlerini içeren 1-D numpy dizisi.
+        """
         try:
             # Özellik çıkarımı
-            result = self.feature_extractor.process_single_file(Path(csv_path), label=-1)
+            if isinstance(source, np.ndarray):
+                result = self.feature_extractor.process_series(np.asarray(source, dtype=np.float64).ravel(), label=-1)
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                result = self.feature_extractor.process_single_file(io.BytesIO(source), label=-1)
+            elif isinstance(source, (str, Path)):
+                result = self.feature_extractor.process_single_file(Path(source), label=-1)
+                file_name = file_name or Path(source).name
+            else:
+                result = self.feature_extractor.process_single_file(source, label=-1)
             if result is None:
                 return {"error": "Could not extract features from the file."}
             
             feature_vector, _ = result
-            
-            # Özellik boyutunu ayarla
-            expected_features = self.main_scaler.n_features_in_
-            if len(feature_vector) != expected_features:
-                if len(feature_vector) < expected_features:
-                    feature_vector = np.pad(feature_vector, (0, expected_features - len(feature_vector)), 'constant')
-                else:
-                    feature_vector = feature_vector[:expected_features]
-            
-            feature_vector = feature_vector.reshape(1, -1)
-            
-            # Ön işleme
-            scaled_features = self.main_scaler.transform(feature_vector)
-            selected_features = self.selector.transform(scaled_features) if self.selector else scaled_features
-            
-            # Tüm modellerden tahmin al
-            all_predictions = []
-            for model_name, model in self.models.items():
-                prediction_result = self.predict_single_model(selected_features, model_name, model)
-                all_predictions.append(prediction_result)
-            
-            # En iyi modelin tahminini bul
-            best_prediction = next((p for p in all_predictions if p["is_best"]), None)
-            
-            # Sonuçları sırala (en iyi model en üstte, sonra güven skoruna göre)
-            all_predictions.sort(key=lambda x: (not x["is_best"], -(x["max_confidence"] if isinstance(x["max_confidence"], float) else 0)))
-            
-            # Özet istatistikler
-            stationary_votes = sum(1 for p in all_predictions if p["prediction"] == "stationary")
-            non_stationary_votes = sum(1 for p in all_predictions if p["prediction"] == "non_stationary")
-            total_models = len(all_predictions)
-            
-            consensus = "stationary" if stationary_votes > non_stationary_votes else "non_stationary"
-            consensus_percentage = round(max(stationary_votes, non_stationary_votes) / total_models * 100, 1)
-            
-            return {
-                "file_name": Path(csv_path).name,
-                "best_model_prediction": best_prediction,
-                "all_predictions": all_predictions,
-                "summary": {
-                    "consensus": consensus,
-                    "consensus_percentage": consensus_percentage,
-                    "stationary_votes": stationary_votes,
-                    "non_stationary_votes": non_stationary_votes,
-                    "total_models": total_models
-                },
-                "best_model_info": {
-                    "name": self.best_model_name,
-                    "score": self.best_model_score
-                }
-            }
+            return self.predict_from_features(feature_vector, file_name or "upload", models)
             
         except Exception as e:
-            return {"error": f"An error occurred during prediction: {str(e)}"}
\ No newline at end of file
+            return {"error": f"An error occurred during prediction: {str(e)}"}
+
+    def predict_many(self, csv_paths: List[str], models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Birden çok CSV için tahmin: özellikler tek matriste toplanır, her model tüm dosyalar için bir kez çağrılır"""
+        try:
+            extracted = self.feature_extractor.process_files_batch([(Path(p), -1) for p in csv_paths])
+        except Exception as e:
+            return [{"error": f"An error occurred during prediction: {str(e)}"} for _ in csv_paths]
+
+        results = [{"error": "Could not extract features from the file."} if result is None else None for result in extracted]
+        rows = [i for i, result in enumerate(extracted) if result is not None]
+        if rows:
+            try:
+                responses = self.predict_feature_matrix([extracted[i][0] for i in rows], [Path(csv_paths[i]).name for i in rows], models)
+                for i, response in zip(rows, responses): results[i] = response
+            except Exception as e:
+                for i in rows: results[i] = {"error": f"An error occurred during prediction: {str(e)}"}
+        return results
+
+    def predict_from_features(self, feature_vector: np.ndarray, file_name: str, models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Çıkarılmış özellik vektörü ile tüm modellerden tahmin al"""
+        return self.predict_feature_matrix([feature_vector], [file_name], models)[0]
+
+    def prepare_features(self, feature_vectors: List[np.ndarray]) -> np.ndarray:
+        """Şema düzenindeki özellik vektörlerini tek matriste ölçekle ve seç"""
+        matrix = np.asarray(feature_vectors, dtype=np.float64)
+        if self.preprocessor is not None:
+            # Yalnızca seçilen sütunlar toplanır ve ölçeklenir (sonuç scaler + selector ile birebir aynı)
+            return self.preprocessor.transform_vectors(matrix)
+        
+        # Model şemanın ilk expected_features sütunuyla eğitildi (eski modeller: yalnızca chunk ortalamaları)
+        expected_features = self.main_scaler.n_features_in_
+        if matrix.shape[1] < expected_features:
+            raise ValueError(f"Models expect {expected_features} features, the extractor produces {matrix.shape[1]}.")
+        matrix = matrix[:, :expected_features]
+        
+        # Ön işleme
+        scaled_features = self.main_scaler.transform(matrix)
+        return self.selector.transform(scaled_features) if self.selector else scaled_features
+
+    def predict_feature_matrix(self, feature_vectors: List[np.ndarray], file_names: List[str],
+                               models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """N dosyanın özellikleri için tüm modellerden (models verilirse yalnızca onlardan) tahmin al; her model tek bir toplu çağrı yapar"""
+        # İstenen modeller gerekirse diskten yüklenir (bilinmeyen model adı ValueError verir)
+        loaded_models = self.models.items(models)
+        if not loaded_models:
+            raise ValueError("No models could be loaded.")
+        selected_features = self.prepare_features(feature_vectors)
+        
+        # Modellerden tahmin al
+        if self.concurrent_inference:
+            per_model = self._predict_models_concurrently(selected_features, loaded_models)
+        else:
+            per_model = [self.predict_model_batch(selected_features, model_name, model) for model_name, model in loaded_models]
+        
+        return [self._build_response([model_results[row] for model_results in per_model], file_name)
+                for row, file_name in enumerate(file_names)]
+
+    def _predict_models_concurrently(self, selected_features: np.ndarray, loaded_models: List[tuple]) -> List[List[Dict[str, Any]]]:
+        """Tüm modelleri kalıcı iş parçacığı havuzunda aynı anda çalıştır; süresi dolan model TIMEOUT olarak döner.
+
+        Çalışmakta olan bir çağrı iptal edilemez: süresi dolup hâlâ çalışan model, o çağrı bitene kadar yeniden
+        gönderilmeden doğrudan TIMEOUT döner. Böylece her model havuzda en fazla bir iş parçacığını bloke eder ve
+        sağlıklı modeller takılan çağrıların arkasında kuyrukta beklemez.
+        """
+        with self._timeout_lock:
+            if self._executor is None:
+                # Takılan her model en fazla bir iş parçacığı tutar; yarısı yeni istekler için boş kalır
+                self._executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS or 2 * max(1, len(self.models)),
+                                                    thread_name_prefix='model-inference')
+            # Biten takılı çağrılar serbest bırakılır, o modeller tekrar çalıştırılabilir
+            self._running_after_timeout = {name: future for name, future in self._running_after_timeout.items() if not future.done()}
+            still_running = set(self._running_after_timeout)
+            futures = {model_name: self._executor.submit(self.predict_model_batch, selected_features, model_name, model)
+                       for model_name, model in loaded_models if model_name not in still_running}
+        wait(futures.values(), timeout=self.model_timeout)
+        
+        per_model = []
+        for model_name, _ in loaded_models:
+            future = futures.get(model_name)
+            if future is not None and future.done():
+                per_model.append(future.result())
+                continue
+            if future is None:
+                error = "Model is still running a previous request that timed out."
+            else:
+                error = f"Model did not respond within {self.model_timeout}s."
+                with self._timeout_lock:
+                    self._running_after_timeout.setdefault(model_name, future)
+            per_model.append([{
+                "model_name": model_name,
+                "prediction": "TIMEOUT",
+                "error": error,
+                "confidence_scores": {},
+                "max_confidence": "N/A",
+                "is_best": model_name == self.best_model_name
+            } for _ in range(len(selected_features))])
+        return per_model
+
+    def close(self):
+        """Eşzamanlı çıkarım havuzunu kapat; takılı çağrılar beklenmez (iş parçacıkları çağrı bitince sonlanır)"""
+        with self._timeout_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            # Hâlâ çalışan çağrıların kaydı korunur: yeni havuzda bu modeller, eski çağrı bitene kadar yeniden gönderilmez
+            self._running_after_timeout = {name: future for name, future in self._running_after_timeout.items() if not future.done()}
+            if self._running_after_timeout:
+                print(f"Inference pool closed with calls still running: {', '.join(sorted(self._running_after_timeout))}")
+
+    def _build_response(self, all_predictions: List[Dict[str, Any]], file_name: str) -> Dict[str, Any]:
+        # En iyi modelin tahminini bul
+        best_prediction = next((p for p in all_predictions if p["is_best"]), None)
+        
+        # Sonuçları sırala (en iyi model en üstte, sonra güven skoruna göre)
+        all_predictions.sort(key=lambda x: (not x["is_best"], -(x["max_confidence"] if isinstance(x["max_confidence"], float) else 0)))
+        
+        # Özet istatistikler
+        stationary_votes = sum(1 for p in all_predictions if p["prediction"] == "stationary")
+        non_stationary_votes = sum(1 for p in all_predictions if p["prediction"] == "non_stationary")
+        total_models = len(all_predictions)
+        
+        consensus = "stationary" if stationary_votes > non_stationary_votes else "non_stationary"
+        consensus_percentage = round(max(stationary_votes, non_stationary_votes) / total_models * 100, 1)
+        
+        return {
+            "file_name": file_name,
+            "best_model_prediction": best_prediction,
+            "all_predictions": all_predictions,
+            "summary": {
+                "consensus": consensus,
+                "consensus_percentage": consensus_percentage,
+                "stationary_votes": stationary_votes,
+                "non_stationary_votes": non_stationary_votes,
+                "total_models": total_models
+            },
+            "best_model_info": {
+                "name": self.best_model_name,
+                "score": self.best_model_score
+            }
+        }
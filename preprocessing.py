@@ -0,0 +1,73 @@
+"""
+Birleşik Ön İşleme (Fused Preprocessing)
+Eğitimde oluşturulan ölçekleyici + seçici zinciri tek bir artefakta indirgenir: seçilen sütun indeksleri ve
+bu sütunların center/scale değerleri. Çıkarımda yalnızca seçilen k sütun toplanır (gather) ve ölçeklenir.
+"""
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+from sklearn.preprocessing import RobustScaler, StandardScaler
+
+PREPROCESSING_FILENAME = 'preprocessing.json'
+
+
+class FusedPreprocessor:
+    """Scaler + selector as selected column indices with per-column center/scale.
+
+    transform() computes (x[columns] - center) / scale, which is bit-identical to scaler.transform followed by
+    selector.transform but only touches the k selected columns.
+    """
+
+    def __init__(self, n_features_in: int, columns: Sequence[int], center: Sequence[float], scale: Sequence[float]):
+        self.n_features_in = int(n_features_in)
+        self.columns = np.asarray(columns, dtype=np.intp)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    @classmethod
+    def from_transformers(cls, scaler, selector=None) -> Optional['FusedPreprocessor']:
+        """Build from fitted sklearn objects; None if the scaler/selector pair cannot be expressed as gather + scale"""
+        if isinstance(scaler, RobustScaler):
+            center, scale = scaler.center_, scaler.scale_
+        elif isinstance(scaler, StandardScaler):
+            center, scale = scaler.mean_, scaler.scale_
+        else:
+            return None
+        if selector is not None and not hasattr(selector, 'get_support'):
+            return None  # ör. PCA: sütun seçimi değil, izdüşüm
+        n_features = scaler.n_features_in_
+        columns = np.arange(n_features) if selector is None else selector.get_support(indices=True)
+        # with_centering / with_scaling=False durumlarında sklearn bu adımı atlar; 0 ve 1 ile aynı sonuç elde edilir
+        center = np.zeros(len(columns)) if center is None else np.asarray(center, dtype=np.float64)[columns]
+        scale = np.ones(len(columns)) if scale is None else np.asarray(scale, dtype=np.float64)[columns]
+        return cls(n_features, columns, center, scale)
+
+    @property
+    def n_features_out(self) -> int:
+        return len(self.columns)
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        """(N, n_features_in) matrix -> (N, k) model input"""
+        return (matrix[:, self.columns] - self.center) / self.scale
+
+    def transform_vectors(self, feature_vectors: Union[np.ndarray, List[np.ndarray]]) -> np.ndarray:
+        """Gather the selected columns straight from full feature-schema vectors (the leading columns the model saw)"""
+        matrix = np.asarray(feature_vectors, dtype=np.float64).reshape(len(feature_vectors), -1)
+        if len(self.columns) and self.columns.max() >= matrix.shape[1]:
+            raise ValueError(f"Preprocessing selects column {int(self.columns.max())}, vectors have {matrix.shape[1]} features.")
+        return (matrix[:, self.columns] - self.center) / self.scale
+
+    def save(self, path: Path):
+        # json float çıktısı repr ile yazılır, değerler birebir geri okunur
+        state = {'n_features_in': self.n_features_in, 'columns': self.columns.tolist(),
+                 'center': self.center.tolist(), 'scale': self.scale.tolist()}
+        with open(path, 'w') as f:
+            json.dump(state, f, indent=2)
+
+    @classmethod
+    def load(cls, path: Path) -> 'FusedPreprocessor':
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return cls(state['n_features_in'], state['columns'], state['center'], state['scale'])
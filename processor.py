@@ -7,17 +7,49 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, IO, Iterable, Iterator, List, Sequence, Tuple, Optional, Union
 import warnings
 from tqdm import tqdm
 import gc
-from concurrent.futures import ProcessPoolExecutor
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing as mp
 
-from config import DATA_PATH, PROCESSED_DATA_DIR, CHUNK_SIZE, FILES_PER_FOLDER_LIMIT, LABEL_MAP
+from config import (DATA_PATH, PROCESSED_DATA_DIR, CHUNK_SIZE, FILES_PER_FOLDER_LIMIT, LABEL_MAP, ROLLING_STAT_METHOD,
+                    BATCH_FILES_PER_TASK, N_WORKERS, TASK_MAX_BYTES, FEATURE_CACHE_ENABLED, STREAMING_OUTPUT,
+                    CSV_READER_ENGINE, CSV_READER_DTYPE, USE_SHARDS, SHARD_DIR, SERIES_FEATURES,
+                    SERIES_QUANTILE_SKETCH_K)
+from rolling_stats import rolling_mean_std
+from feature_cache import FeatureCache, file_identity
+from feature_writer import FeatureWriter
+from csv_readers import read_data_column, iter_data_chunks, check_engine
+from shards import Shard, get_shard, open_shards, load_manifest, convert_to_shards
+from streaming_features import SeriesAccumulator, SERIES_FEATURE_NAMES, SERIES_QUANTILE_NAMES
+from feature_schema import FeatureSchema, BASE_FEATURE_NAMES, BASE_FEATURE_INDEX, FEATURE_EXTRACTOR_VERSION, base_feature_index
 
 warnings.filterwarnings('ignore')
 
+# Eğitimin model dizinine yazdığı, çıkarımda gereken temel özelliklerin listesi
+FEATURE_PLAN_FILENAME = 'feature_plan.json'
+
+def required_base_features(columns: Iterable[int]) -> List[str]:
+    """Base features needed to produce the given columns of a file vector (FeatureSchema layout; series_* columns need none)"""
+    needed = {base_feature_index(int(j)) for j in columns} - {-1}
+    return [BASE_FEATURE_NAMES[i] for i in sorted(needed)]
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks / container CPU sets where available)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _file_size(file_path: Path) -> int:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
 # process_single_file metodunu sınıf dışına alıp, daha kolay map'lenebilir hale getireceğiz.
 # Ancak sınıf içindeki helper metodları kullandığı için, sınıfın bir kopyasını da almalı.
 # Daha temiz bir çözüm için, wrapper metodu kullanalım.
@@ -25,10 +57,33 @@ warnings.filterwarnings('ignore')
 class TimeSeriesDataProcessor:
     """Efficient processor for large-scale time series data"""
     
-    def __init__(self, base_path: str, chunk_size: int = 10000):
+    def __init__(self, base_path: str, chunk_size: int = 10000, rolling_method: str = ROLLING_STAT_METHOD,
+                 feature_cache: Optional[FeatureCache] = None, feature_plan: Optional[Sequence[str]] = None,
+                 csv_engine: str = CSV_READER_ENGINE, csv_dtype: str = CSV_READER_DTYPE, series_features: bool = SERIES_FEATURES,
+                 quantile_sketch_k: Optional[int] = SERIES_QUANTILE_SKETCH_K):
         self.base_path = Path(base_path)
         self.chunk_size = chunk_size
+        self.rolling_method = rolling_method
+        self.feature_cache = feature_cache
+        check_engine(csv_engine)
+        self.csv_engine = csv_engine
+        self.csv_dtype = csv_dtype
+        self.series_features = series_features
+        self.quantile_sketch_k = quantile_sketch_k if series_features else None
+        self.schema = FeatureSchema(self.series_feature_names())
+        # Özellik planı: yalnızca bu temel özellikler hesaplanır, diğerleri 0 yazılır (None: hepsi)
+        unknown = set(feature_plan or ()) - set(BASE_FEATURE_NAMES)
+        if unknown: raise ValueError(f"Unknown features in plan: {sorted(unknown)}")
+        self.feature_plan = None if feature_plan is None or set(feature_plan) == set(BASE_FEATURE_NAMES) else frozenset(feature_plan)
         self.file_paths = {'stationary': [], 'non_stationary': []}
+
+    def feature_version(self) -> str:
+        """Identifies everything that changes the produced vectors (used as the feature cache version)"""
+        version = f"{FEATURE_EXTRACTOR_VERSION}:{self.chunk_size}:{self.rolling_method}"
+        # Varsayılan okuyucu (pandas, float64) eski önbellek sürümünü korur
+        if (self.csv_engine, self.csv_dtype) != ('pandas', 'float64'): version += f":csv={self.csv_engine}/{self.csv_dtype}"
+        if self.series_features: version += ":series" + (f"+kll{self.quantile_sketch_k}" if self.quantile_sketch_k else "")
+        return version if self.feature_plan is None else f"{version}:plan={','.join(sorted(self.feature_plan))}"
         
     def scan_directories(self):
         print("Scanning directories for CSV files...")
@@ -55,137 +110,395 @@ class TimeSeriesDataProcessor:
     
     # ... Diğer tüm _calculate, _rolling, _autocorrelation vb. helper fonksiyonları burada AYNEN kalacak ...
     def extract_features_from_chunk(self, data: np.ndarray) -> Optional[Dict]:
+        """Feature dict of a single chunk (one row of the fused batch kernel)"""
+        row = self._chunk_row(data)
+        return None if row is None else dict(zip(BASE_FEATURE_NAMES, row))
+    def _chunk_row(self, data: np.ndarray) -> Optional[np.ndarray]:
         if len(data) < 2: return None
-        features = {}
         try:
-            features['mean'] = np.mean(data); features['std'] = np.std(data); features['var'] = np.var(data)
-            features['min'] = np.min(data); features['max'] = np.max(data); features['range'] = features['max'] - features['min']
-            features['q25'] = np.percentile(data, 25); features['median'] = np.median(data); features['q75'] = np.percentile(data, 75)
-            features['iqr'] = features['q75'] - features['q25']; features['skewness'] = self._calculate_skewness(data)
-            features['kurtosis'] = self._calculate_kurtosis(data); features['cv'] = features['std'] / (features['mean'] + 1e-10)
-            diff1 = np.diff(data); features['diff1_mean'] = np.mean(diff1); features['diff1_std'] = np.std(diff1); features['diff1_var'] = np.var(diff1)
-            if len(diff1) > 1:
-                diff2 = np.diff(diff1); features['diff2_mean'] = np.mean(diff2); features['diff2_std'] = np.std(diff2)
-            else:
-                features['diff2_mean'] = 0; features['diff2_std'] = 0
-            window_size = max(2, len(data) // 10)
-            if window_size < len(data):
-                rolling_means = self._rolling_window_stat(data, window_size, np.mean); rolling_stds = self._rolling_window_stat(data, window_size, np.std)
-                features['rolling_mean_std'] = np.std(rolling_means); features['rolling_std_mean'] = np.mean(rolling_stds); features['rolling_std_std'] = np.std(rolling_stds)
-            else:
-                features['rolling_mean_std'] = 0; features['rolling_std_mean'] = features['std']; features['rolling_std_std'] = 0
-            features['autocorr_lag1'] = self._autocorrelation(data, 1); features['autocorr_lag10'] = self._autocorrelation(data, min(10, len(data)-1))
-            features['num_peaks'] = self._count_peaks(data); features['zero_crossing_rate'] = self._zero_crossing_rate(data - np.mean(data))
+            return self.extract_features_batch(np.asarray(data)[np.newaxis, :])[0]
         except Exception: return None
-        return features
-    def _calculate_skewness(self, data: np.ndarray) -> float:
-        n = len(data); mean = np.mean(data); std = np.std(data)
-        if std == 0 or n < 3: return 0
-        return (n / ((n-1) * (n-2))) * np.sum(((data - mean) / std) ** 3)
-    def _calculate_kurtosis(self, data: np.ndarray) -> float:
-        n = len(data); mean = np.mean(data); std = np.std(data)
-        if std == 0 or n < 4: return 0
-        return (n * (n+1) / ((n-1) * (n-2) * (n-3))) * np.sum(((data - mean) / std) ** 4) - (3 * (n-1)**2 / ((n-2) * (n-3)))
-    def _rolling_window_stat(self, data: np.ndarray, window: int, func) -> np.ndarray:
-        return np.array([func(data[i:i+window]) for i in range(len(data) - window + 1)])
-    def _autocorrelation(self, data: np.ndarray, lag: int) -> float:
-        if lag >= len(data) or lag < 1: return 0
-        n = len(data); mean = np.mean(data); c0 = np.sum((data - mean) ** 2) / n
-        if c0 == 0: return 0
-        ck = np.sum((data[:-lag] - mean) * (data[lag:] - mean)) / n
-        return ck / c0
-    def _count_peaks(self, data: np.ndarray) -> int:
-        if len(data) < 3: return 0
-        return sum(1 for i in range(1, len(data) - 1) if data[i] > data[i-1] and data[i] > data[i+1])
-    def _zero_crossing_rate(self, data: np.ndarray) -> float:
-        if len(data) < 2: return 0
-        return np.sum(np.diff(np.sign(data)) != 0) / (len(data) - 1)
-    def _aggregate_chunk_features(self, chunks_features: List[Dict]) -> Dict:
-        if not chunks_features: return {}
-        if len(chunks_features) == 1: return chunks_features[0]
-        aggregated = {}
-        feature_names = chunks_features[0].keys()
-        for feature in feature_names:
-            values = [chunk[feature] for chunk in chunks_features]
-            aggregated[f'{feature}_mean'] = np.mean(values)
-            aggregated[f'{feature}_std'] = np.std(values)
-        return aggregated
+    def extract_features_batch(self, data: np.ndarray) -> np.ndarray:
+        """Fused feature kernel over an (N, L) matrix of equal-length chunks; returns (N, len(BASE_FEATURE_NAMES))"""
+        n = data.shape[-1]
+        if n < 2: raise ValueError("Chunks need at least two samples.")
+        # Hesaplanmayan (plan dışı veya tanımsız) özellikler 0 kalır
+        out = np.zeros(data.shape[:-1] + (len(BASE_FEATURE_NAMES),)); plan = self.feature_plan
+        need = lambda *names: plan is None or not plan.isdisjoint(names)
+        def put(name, values): out[..., BASE_FEATURE_INDEX[name]] = values
+        # Ortak ara değerler: ortalama/sapma/varyans tek seferde, sıra istatistikleri tek partition ile
+        mean, dev, var = self._central_moments(data); std = np.sqrt(var)
+        put('mean', mean); put('std', std); put('var', var)
+        put('cv', std / (mean + 1e-10))
+        if need('min', 'max', 'range', 'q25', 'median', 'q75', 'iqr'):
+            minimum, q25, median, q75, maximum = self._order_statistics(data)
+            put('min', minimum); put('max', maximum); put('range', maximum - minimum)
+            put('q25', q25); put('median', median); put('q75', q75); put('iqr', q75 - q25)
+        if need('skewness', 'kurtosis'):
+            nonzero_std = std != 0
+            z = dev / np.where(nonzero_std, std, 1)[..., np.newaxis]
+            put('skewness', np.where(nonzero_std, self._calculate_skewness(z), 0))
+            put('kurtosis', np.where(nonzero_std, self._calculate_kurtosis(z), 0))
+        if need('diff1_mean', 'diff1_std', 'diff1_var', 'diff2_mean', 'diff2_std'):
+            diff1 = data[..., 1:] - data[..., :-1]; diff1_mean, _, diff1_var = self._central_moments(diff1)
+            put('diff1_mean', diff1_mean); put('diff1_std', np.sqrt(diff1_var)); put('diff1_var', diff1_var)
+            if n - 1 > 1 and need('diff2_mean', 'diff2_std'):
+                diff2 = diff1[..., 1:] - diff1[..., :-1]; diff2_mean, _, diff2_var = self._central_moments(diff2)
+                put('diff2_mean', diff2_mean); put('diff2_std', np.sqrt(diff2_var))
+        window_size = max(2, n // 10)
+        if not need('rolling_mean_std', 'rolling_std_mean', 'rolling_std_std'):
+            pass
+        elif window_size < n:
+            rolling_means, rolling_stds = rolling_mean_std(data, window_size, method=self.rolling_method)
+            put('rolling_mean_std', np.std(rolling_means, axis=-1)); put('rolling_std_mean', np.mean(rolling_stds, axis=-1)); put('rolling_std_std', np.std(rolling_stds, axis=-1))
+        else:
+            put('rolling_std_mean', std)
+        if need('autocorr_lag1', 'autocorr_lag10'):
+            put('autocorr_lag1', self._autocorrelation(data, 1, dev, var)); put('autocorr_lag10', self._autocorrelation(data, min(10, n-1), dev, var))
+        if need('num_peaks'): put('num_peaks', self._count_peaks(data))
+        if need('zero_crossing_rate'): put('zero_crossing_rate', self._zero_crossing_rate(dev))
+        return out
+    # Aşağıdaki yardımcılar son eksen boyunca çalışır: tek seri (L,) veya seri matrisi (N, L)
+    def _central_moments(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mean, deviations and population variance; bit-identical to np.mean / np.var"""
+        n = data.shape[-1]; mean = np.mean(data, axis=-1); dev = data - mean[..., np.newaxis]
+        return mean, dev, np.sum(dev * dev, axis=-1) / n
+    def _order_statistics(self, data: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """min, q25, median, q75, max from a single partition (same results as np.percentile / np.median)"""
+        n = data.shape[-1]; last = n - 1
+        lo25, lo75, mid = (last * 25) // 100, (last * 75) // 100, n // 2
+        kth = sorted({0, lo25, min(lo25 + 1, last), lo75, min(lo75 + 1, last), max(mid - 1, 0), mid, last})
+        part = np.partition(data, kth, axis=-1)
+        median = part[..., mid] * 1.0 if n % 2 else (part[..., mid - 1] + part[..., mid]) / 2
+        return part[..., 0], self._lerp(part, last * 0.25), median, self._lerp(part, last * 0.75), part[..., last]
+    @staticmethod
+    def _lerp(part: np.ndarray, virtual_index: float) -> np.ndarray:
+        # np.percentile(method='linear') ile aynı enterpolasyon formülü
+        i = int(virtual_index); t = virtual_index - i
+        a = part[..., i]; b = part[..., min(i + 1, part.shape[-1] - 1)]; diff = b - a
+        return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+    def _calculate_skewness(self, z: np.ndarray) -> np.ndarray:
+        n = z.shape[-1]
+        if n < 3: return np.zeros(z.shape[:-1])
+        return (n / ((n-1) * (n-2))) * np.sum(z ** 3, axis=-1)
+    def _calculate_kurtosis(self, z: np.ndarray) -> np.ndarray:
+        n = z.shape[-1]
+        if n < 4: return np.zeros(z.shape[:-1])
+        return (n * (n+1) / ((n-1) * (n-2) * (n-3))) * np.sum(z ** 4, axis=-1) - (3 * (n-1)**2 / ((n-2) * (n-3)))
+    def _autocorrelation(self, data: np.ndarray, lag: int, dev: Optional[np.ndarray] = None, c0: Optional[np.ndarray] = None) -> np.ndarray:
+        n = data.shape[-1]
+        if lag >= n or lag < 1: return np.zeros(data.shape[:-1])
+        if dev is None: dev = data - np.mean(data, axis=-1, keepdims=True)
+        if c0 is None: c0 = np.sum(dev ** 2, axis=-1) / n
+        ck = np.sum(dev[..., :-lag] * dev[..., lag:], axis=-1) / n
+        return np.divide(ck, c0, out=np.zeros_like(ck), where=c0 != 0)
+    def _count_peaks(self, data: np.ndarray) -> np.ndarray:
+        if data.shape[-1] < 3: return np.zeros(data.shape[:-1], dtype=np.intp)
+        # Kaydırılmış görünümler üzerinde boolean maske: iki komşusundan da büyük olan iç noktalar
+        center = data[..., 1:-1]
+        return np.count_nonzero((center > data[..., :-2]) & (center > data[..., 2:]), axis=-1)
+    def _zero_crossing_rate(self, data: np.ndarray) -> np.ndarray:
+        n = data.shape[-1]
+        if n < 2: return np.zeros(data.shape[:-1])
+        signs = np.sign(data)
+        return np.count_nonzero(signs[..., 1:] != signs[..., :-1], axis=-1) / (n - 1)
+    def series_feature_names(self) -> Tuple[str, ...]:
+        if not self.series_features: return ()
+        return SERIES_FEATURE_NAMES + (SERIES_QUANTILE_NAMES if self.quantile_sketch_k else ())
+
+    def _series_accumulator(self) -> Optional[SeriesAccumulator]:
+        return SeriesAccumulator(self.quantile_sketch_k) if self.series_features else None
+
+    def _file_vector(self, chunk_rows: List[np.ndarray], accumulator: Optional[SeriesAccumulator]) -> np.ndarray:
+        """Schema-ordered vector from the per-chunk feature rows (one chunk: mean = its features, std = 0)"""
+        vector = np.empty(self.schema.n_features)
+        np.mean(chunk_rows, axis=0, out=vector[self.schema.mean_columns])
+        np.std(chunk_rows, axis=0, out=vector[self.schema.std_columns])
+        if accumulator is not None: vector[self.schema.series_columns] = accumulator.feature_vector()
+        return vector
 
     # Bu iki fonksiyonu process_files_parallel'in düzgün çalışması için ekliyoruz.
-    def process_single_file(self, file_path: Path, label: int) -> Optional[Tuple[np.ndarray, int]]:
+    def process_single_file(self, file_path: Union[Path, IO], label: int) -> Optional[Tuple[np.ndarray, int]]:
+        """Chunked CSV read of a path or an open file-like object (e.g. an upload stream)"""
         try:
-            chunks_features = []
-            for chunk in pd.read_csv(file_path, chunksize=self.chunk_size, usecols=['data']):
-                if 'data' not in chunk.columns: continue
-                data_values = chunk['data'].dropna().values
-                if len(data_values) > 1:
-                    features = self.extract_features_from_chunk(data_values)
-                    if features: chunks_features.append(features)
+            chunk_rows = []
+            # Tüm seri özellikleri chunk'lar geçerken sabit boyutlu durumla biriktirilir
+            accumulator = self._series_accumulator()
+            for data_values in iter_data_chunks(file_path, self.chunk_size, self.csv_engine, self.csv_dtype):
+                data_values = np.asarray(data_values[~np.isnan(data_values)], dtype=np.float64)
+                if accumulator is not None: accumulator.update(data_values)
+                row = self._chunk_row(data_values)
+                if row is not None: chunk_rows.append(row)
             
-            if chunks_features:
-                aggregated_features = self._aggregate_chunk_features(chunks_features)
-                feature_vector = np.array(list(aggregated_features.values()))
-                return feature_vector, label
+            if chunk_rows:
+                return self._file_vector(chunk_rows, accumulator), label
         except Exception:
             return None
         return None
 
+    def process_series(self, values: np.ndarray, label: int) -> Optional[Tuple[np.ndarray, int]]:
+        """Per-series path for an in-memory array; chunks and aggregates exactly like process_single_file"""
+        chunk_rows = []
+        accumulator = self._series_accumulator()
+        for start in range(0, len(values), self.chunk_size):
+            data_values = values[start:start + self.chunk_size]
+            data_values = data_values[~pd.isna(data_values)]
+            if accumulator is not None: accumulator.update(data_values)
+            row = self._chunk_row(data_values)
+            if row is not None: chunk_rows.append(row)
+        if chunk_rows:
+            return self._file_vector(chunk_rows, accumulator), label
+        return None
+
+    def process_series_batch(self, series: np.ndarray) -> np.ndarray:
+        """Batch mode: features of N equal-length series stacked as an (N, L) matrix, computed along axis=1"""
+        length = series.shape[1]
+        chunk_features = [self.extract_features_batch(np.ascontiguousarray(series[:, start:start + self.chunk_size]))
+                          for start in range(0, length, self.chunk_size) if min(self.chunk_size, length - start) > 1]
+        if not chunk_features: raise ValueError("Series need at least two samples.")
+        # _file_vector ile aynı düzen, doğrudan önceden ayrılmış (N, n_features) matrise yazılır
+        stacked = np.stack(chunk_features)
+        features = np.empty((series.shape[0], self.schema.n_features))
+        np.mean(stacked, axis=0, out=features[:, self.schema.mean_columns])
+        np.std(stacked, axis=0, out=features[:, self.schema.std_columns])
+        if self.series_features:
+            # Birikim process_single_file ile aynı chunk'larla yapılır; sketch (rastgele sıkıştırma) böylece aynı sonucu verir
+            for row, values in zip(features, series):
+                accumulator = self._series_accumulator()
+                for start in range(0, length, self.chunk_size): accumulator.update(values[start:start + self.chunk_size])
+                row[self.schema.series_columns] = accumulator.feature_vector()
+        return features
+
+    def _load_series(self, file_path: Path) -> Optional[np.ndarray]:
+        try:
+            return np.asarray(read_data_column(file_path, self.csv_engine, self.csv_dtype), dtype=np.float64)
+        except Exception:
+            return None
+
+    def process_files_batch(self, files: List[Tuple[Path, int]]) -> List[Optional[Tuple[np.ndarray, int]]]:
+        """Feature vectors for many files; equal-length series share one batch kernel call, ragged ones go per-file"""
+        return self.process_series_many([(self._load_series(file_path), label) for file_path, label in files])
+
+    def process_series_many(self, items: List[Tuple[Optional[np.ndarray], int]]) -> List[Optional[Tuple[np.ndarray, int]]]:
+        """Feature vectors for many in-memory (values or None, label) series, grouped by length for the batch kernel"""
+        results = [None] * len(items)
+        series, groups = {}, {}
+        for i, (values, label) in enumerate(items):
+            if values is None: continue
+            # NaN içeren seriler chunk bazında dropna gerektirir, bu yüzden tek dosya yoluna gider
+            if np.isnan(values).any():
+                results[i] = self.process_series(values, label)
+                continue
+            series[i] = values
+            groups.setdefault(len(values), []).append(i)
+
+        for indices in groups.values():
+            if len(indices) > 1:
+                try:
+                    matrix = self.process_series_batch(np.stack([series[i] for i in indices]))
+                    for i, row in zip(indices, matrix): results[i] = (row, items[i][1])
+                    continue
+                except Exception:
+                    pass
+            for i in indices: results[i] = self.process_series(series[i], items[i][1])
+        return results
+
     @staticmethod
-    def _process_file_static(args):
-        # Bu statik metot, ProcessPoolExecutor.map tarafından çağrılabilir olacak.
-        # Gerekli tüm bilgileri 'args' ile alır.
-        file_path, label, chunk_size_instance = args
+    def _process_task_static(args):
+        # Bu statik metot, ProcessPoolExecutor.submit tarafından çağrılabilir olacak.
+        # Gerekli tüm bilgileri 'args' ile alır ve işçi istatistikleriyle birlikte sonuç döndürür.
+        files, chunk_size_instance, rolling_method, csv_engine, csv_dtype, series_features, quantile_sketch_k, batched = args
+        start_time = time.perf_counter()
         
         # Sınıfın geçici bir örneğini oluşturup metodları kullanalım
-        temp_processor = TimeSeriesDataProcessor(base_path='', chunk_size=chunk_size_instance)
-        return temp_processor.process_single_file(file_path, label)
+        temp_processor = TimeSeriesDataProcessor(base_path='', chunk_size=chunk_size_instance, rolling_method=rolling_method,
+                                                 csv_engine=csv_engine, csv_dtype=csv_dtype, series_features=series_features,
+                                                 quantile_sketch_k=quantile_sketch_k)
+        if batched:
+            results = temp_processor.process_files_batch(files)
+        else:
+            results = [temp_processor.process_single_file(file_path, label) for file_path, label in files]
+        stats = {'pid': os.getpid(), 'files': len(files), 'bytes': sum(_file_size(f) for f, _ in files),
+                 'seconds': time.perf_counter() - start_time}
+        return results, stats
 
-    def process_files_parallel(self) -> Tuple[np.ndarray, np.ndarray]:
-        stationary_files = self.file_paths['stationary']
-        non_stationary_files = self.file_paths['non_stationary']
-        all_files_tuples = [(f, LABEL_MAP['stationary']) for f in stationary_files] + \
-                           [(f, LABEL_MAP['non_stationary']) for f in non_stationary_files]
+    @staticmethod
+    def _process_shard_task_static(args):
+        # Dosya görevlerinin shard karşılığı: seriler işçinin memory-map ettiği shard'dan dilimlenir
+        shard_dir, indices, chunk_size, rolling_method, series_features, quantile_sketch_k = args
+        start_time = time.perf_counter()
+        shard = get_shard(shard_dir)
+        temp_processor = TimeSeriesDataProcessor(base_path='', chunk_size=chunk_size, rolling_method=rolling_method,
+                                                 series_features=series_features, quantile_sketch_k=quantile_sketch_k)
+        items = [(shard.series(i), int(shard.labels[i])) for i in indices]
+        results = temp_processor.process_series_many(items)
+        stats = {'pid': os.getpid(), 'files': len(indices), 'bytes': sum(values.nbytes for values, _ in items),
+                 'seconds': time.perf_counter() - start_time}
+        return results, stats
+
+    def _plan_tasks(self, files: List[Tuple[Path, int]], files_per_task: int) -> List[List[Tuple[Path, int]]]:
+        """Largest-file-first task list; a task holds up to files_per_task files and about TASK_MAX_BYTES of CSV"""
+        sized = sorted(((_file_size(fp), fp, lbl) for fp, lbl in files), key=lambda item: item[0], reverse=True)
+        tasks, current, current_bytes = [], [], 0
+        for size, fp, lbl in sized:
+            if current and (len(current) >= files_per_task or current_bytes + size > TASK_MAX_BYTES):
+                tasks.append(current); current, current_bytes = [], 0
+            current.append((fp, lbl)); current_bytes += size
+        if current: tasks.append(current)
+        return tasks
+
+    def _report_worker_stats(self, worker_stats: List[Dict], wall_time: float):
+        per_worker = {}
+        for stats in worker_stats:
+            entry = per_worker.setdefault(stats['pid'], {'tasks': 0, 'files': 0, 'bytes': 0, 'seconds': 0.0})
+            entry['tasks'] += 1; entry['files'] += stats['files']; entry['bytes'] += stats['bytes']; entry['seconds'] += stats['seconds']
+        print(f"\nWorker throughput ({len(per_worker)} workers, wall time {wall_time:.1f}s):")
+        for pid, entry in sorted(per_worker.items()):
+            busy = max(entry['seconds'], 1e-9)
+            print(f"  pid {pid}: {entry['tasks']} tasks, {entry['files']} files, {entry['bytes'] / 1e6:.1f} MB, "
+                  f"busy {busy:.1f}s ({busy / max(wall_time, 1e-9):.0%}), {entry['files'] / busy:.1f} files/s, {entry['bytes'] / 1e6 / busy:.1f} MB/s")
+        total_files = sum(entry['files'] for entry in per_worker.values())
+        print(f"  total: {total_files / max(wall_time, 1e-9):.1f} files/s")
+
+    def _run_pool(self, files: List[Tuple[Path, int]], identities: Dict) -> Iterator[Tuple[Path, int, Optional[np.ndarray]]]:
+        # --- OPTİMİZASYONLAR BURADA ---
+        # 1. İşçi sayısı kullanılabilir CPU sayısından (veya config'den) belirlenir
+        # 2. Görevler dosya boyutuna göre büyükten küçüğe sıralanır, böylece büyük dosyalar kuyruğun sonunda beklemez
+        # 3. Sonuçlar as_completed ile geldikçe toplanır
+        batched = bool(BATCH_FILES_PER_TASK)
+        max_workers = N_WORKERS or available_cpus()
+        # İşçi başına en az ~4 görev düşecek şekilde görev boyutu küçültülür (yük dengesi)
+        files_per_task = min(BATCH_FILES_PER_TASK if batched else 100, -(-len(files) // (max_workers * 4)))
+        tasks = self._plan_tasks(files, max(1, files_per_task))
+        n_workers = max(1, min(max_workers, len(tasks)))
+        print(f"\nProcessing {len(files)} files in {len(tasks)} tasks with {n_workers} workers...")
         
+        worker_stats = []
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(self._process_task_static, (task, self.chunk_size, self.rolling_method, self.csv_engine, self.csv_dtype, self.series_features, self.quantile_sketch_k, batched)): task for task in tasks}
+            with tqdm(total=len(files), desc="Processing Files") as progress:
+                for future in as_completed(futures):
+                    task_results, stats = future.result()
+                    worker_stats.append(stats)
+                    progress.update(len(task_results))
+                    if self.feature_cache is not None:
+                        self.feature_cache.put_many([(identities[fp], result[0] if result else None)
+                                                     for (fp, _), result in zip(futures[future], task_results) if identities.get(fp)])
+                    for (fp, lbl), result in zip(futures[future], task_results):
+                        yield fp, lbl, result[0] if result else None
+        self._report_worker_stats(worker_stats, time.perf_counter() - start_time)
+
+    def _labelled_files(self) -> List[Tuple[Path, int]]:
+        return [(f, LABEL_MAP['stationary']) for f in self.file_paths['stationary']] + \
+               [(f, LABEL_MAP['non_stationary']) for f in self.file_paths['non_stationary']]
+
+    def iter_file_results(self, files: List[Tuple[Path, int]]) -> Iterator[Tuple[Path, int, Optional[np.ndarray]]]:
+        """Yield (file, label, feature vector or None) as results become available: cache hits first, then pool results"""
+        pending, identities = files, {}
+        if self.feature_cache is not None:
+            # Değişmemiş dosyaların vektörleri önbellekten gelir; sadece yeni/değişmiş dosyalar işlenir
+            identities = {fp: file_identity(fp, self.feature_cache.key) for fp, _ in files}
+            cached = self.feature_cache.get_many([identity for identity in identities.values() if identity])
+            pending = [(fp, lbl) for fp, lbl in files if not identities[fp] or identities[fp][0] not in cached]
+            print(f"\nFeature cache: {len(files) - len(pending)} files unchanged, {len(pending)} new or modified files to process.")
+            for fp, lbl in files:
+                if identities[fp] and identities[fp][0] in cached:
+                    yield fp, lbl, cached[identities[fp][0]]
+
+        if pending:
+            yield from self._run_pool(pending, identities)
+        if self.feature_cache is not None:
+            self.feature_cache.evict()
+
+    def iter_shard_results(self, shards: List[Shard], sources: Optional[set] = None) -> Iterator[Tuple[str, int, Optional[np.ndarray]]]:
+        """Yield (source, label, feature vector or None) for the series in `shards` (only `sources` if given)"""
+        selected = [(shard, [i for i, source in enumerate(shard.sources) if sources is None or source in sources]) for shard in shards]
+        total = sum(len(indices) for _, indices in selected)
+        if not total: return
+        max_workers = N_WORKERS or available_cpus()
+        # Komşu seriler aynı görevde kalır: shard içinde ardışık okuma, eşit uzunluklular tek batch çağrısı
+        per_task = max(1, min(BATCH_FILES_PER_TASK or 100, -(-total // (max_workers * 4))))
+        tasks = [(shard, indices[start:start + per_task]) for shard, indices in selected for start in range(0, len(indices), per_task)]
+        n_workers = max(1, min(max_workers, len(tasks)))
+        print(f"\nProcessing {total} series from {len(shards)} shards in {len(tasks)} tasks with {n_workers} workers...")
+
+        worker_stats = []
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(self._process_shard_task_static, (str(shard.shard_dir), indices, self.chunk_size, self.rolling_method, self.series_features, self.quantile_sketch_k)): (shard, indices)
+                       for shard, indices in tasks}
+            with tqdm(total=total, desc="Processing Series") as progress:
+                for future in as_completed(futures):
+                    task_results, stats = future.result()
+                    worker_stats.append(stats)
+                    progress.update(len(task_results))
+                    shard, indices = futures[future]
+                    for i, result in zip(indices, task_results):
+                        yield shard.sources[i], int(shard.labels[i]), result[0] if result else None
+        self._report_worker_stats(worker_stats, time.perf_counter() - start_time)
+
+    def _shard_entries(self, shards: List[Shard]) -> List[Tuple[str, int]]:
+        return [(source, int(label)) for shard in shards for source, label in zip(shard.sources, shard.labels)]
+
+    def process_files_parallel(self) -> Tuple[np.ndarray, np.ndarray]:
+        all_files_tuples = self._labelled_files()
         if not all_files_tuples: return np.array([]), np.array([])
-        
-        print(f"\nProcessing {len(all_files_tuples)} files in parallel (Optimized)...")
-        
-        # --- OPTİMİZASYONLAR BURADA ---
-        n_workers = 4  # 1. Optimizasyon: Çalışan sayısını sabitle
-        chunk_size_for_map = 100 # 2. Optimizasyon: Görevleri 100'lük partiler halinde dağıt
+        return self._collect_results(self.iter_file_results(all_files_tuples))
 
-        # Statik metoda göndereceğimiz argüman listesini hazırlayalım
-        task_args = [(fp, lbl, self.chunk_size) for fp, lbl in all_files_tuples]
-        
+    def process_shards(self, shard_dir: Path = SHARD_DIR) -> Tuple[np.ndarray, np.ndarray]:
+        """process_files_parallel over the columnar shards instead of the CSV files"""
+        shards = open_shards(shard_dir)
+        if not any(len(shard) for shard in shards): return np.array([]), np.array([])
+        return self._collect_results(self.iter_shard_results(shards))
+
+    def _collect_results(self, results: Iterator[Tuple[object, int, Optional[np.ndarray]]]) -> Tuple[np.ndarray, np.ndarray]:
         X, y = [], []
-        with ProcessPoolExecutor(max_workers=n_workers) as executor:
-            # executor.map, görevleri partiler halinde (chunksize) gönderir, bu da verimliliği artırır.
-            results = list(tqdm(
-                executor.map(self._process_file_static, task_args, chunksize=chunk_size_for_map),
-                total=len(all_files_tuples),
-                desc="Processing Files"
-            ))
-
-        for result in results:
-            if result:
-                feature_vector, label = result
+        for _, label, feature_vector in results:
+            if feature_vector is not None:
                 X.append(feature_vector)
                 y.append(label)
         
-        if X:
-            lengths = {len(row) for row in X}
-            if len(lengths) > 1:
-                max_cols = max(lengths)
-                print(f"Feature vectors have inconsistent lengths. Padding to {max_cols}.")
-                X = [np.pad(row, (0, max_cols - len(row)), 'constant') if len(row) < max_cols else row for row in X]
+        # Şema sabit olduğu için tüm vektörler aynı genişlikte; boş sonuç da doğru sütun sayısını taşır
+        return np.array(X).reshape(len(X), self.schema.n_features), np.array(y)
 
-        return np.array(X), np.array(y)
+    def process_files_streaming(self, output_dir: str) -> int:
+        """Like process_files_parallel, but rows go straight to a checkpointed on-disk writer and a killed run resumes"""
+        return self._stream_to_writer(output_dir, self._labelled_files(), self.iter_file_results)
+
+    def process_shards_streaming(self, output_dir: str, shard_dir: Path = SHARD_DIR) -> int:
+        """process_files_streaming over the columnar shards instead of the CSV files"""
+        shards = open_shards(shard_dir)
+        return self._stream_to_writer(output_dir, self._shard_entries(shards),
+                                      lambda remaining: self.iter_shard_results(shards, {source for source, _ in remaining}))
+
+    def _stream_to_writer(self, output_dir: str, all_files_tuples: List[Tuple[object, int]], iter_results) -> int:
+        if not all_files_tuples: return 0
+
+        writer = FeatureWriter(output_dir, n_features=self.schema.n_features, capacity=len(all_files_tuples),
+                               version=self.feature_version())
+        done = writer.resume()
+        remaining = [(fp, lbl) for fp, lbl in all_files_tuples if str(fp) not in done]
+        writer.ensure_capacity(writer.rows + len(remaining))
+        if done:
+            print(f"{len(all_files_tuples) - len(remaining)} files already written, {len(remaining)} remaining.")
+
+        for file_path, label, feature_vector in iter_results(remaining):
+            if feature_vector is not None:
+                writer.append(feature_vector, label, str(file_path))
+        n_rows = writer.finalize()
+        self.schema.save(output_dir)
+        print(f"Saved processed data to {output_dir}")
+        print(f"Features shape: ({n_rows}, {writer.n_features})")
+        print(f"Labels shape: ({n_rows},)")
+        return n_rows
 
     def save_processed_data(self, X: np.ndarray, y: np.ndarray, output_dir: str):
         # Bu fonksiyon aynı kalabilir
         os.makedirs(output_dir, exist_ok=True)
         np.save(os.path.join(output_dir, 'features.npy'), X)
         np.save(os.path.join(output_dir, 'labels.npy'), y)
+        self.schema.save(output_dir)
         print(f"Saved processed data to {output_dir}")
         print(f"Features shape: {X.shape}")
         print(f"Labels shape: {y.shape}")
@@ -193,10 +506,31 @@ class TimeSeriesDataProcessor:
 def run_processing():
     print("--- Veri İşleme Aşaması Başladı ---")
     processor = TimeSeriesDataProcessor(base_path=DATA_PATH, chunk_size=CHUNK_SIZE)
-    processor.scan_directories()
-    X, y = processor.process_files_parallel()
-    if X.shape[0] > 0:
-        processor.save_processed_data(X, y, output_dir=str(PROCESSED_DATA_DIR))
+    if FEATURE_CACHE_ENABLED:
+        processor.feature_cache = FeatureCache(version=processor.feature_version())
+    if USE_SHARDS:
+        # Shard'lar yoksa CSV derlemi bir kez dönüştürülür; sonraki çalıştırmalar doğrudan shard'ları okur
+        if load_manifest(SHARD_DIR) is None:
+            processor.scan_directories()
+            convert_to_shards(processor._labelled_files(), SHARD_DIR)
+        if STREAMING_OUTPUT:
+            n_rows = processor.process_shards_streaming(output_dir=str(PROCESSED_DATA_DIR), shard_dir=SHARD_DIR)
+        else:
+            X, y = processor.process_shards(SHARD_DIR)
+            n_rows = X.shape[0]
+            if n_rows > 0:
+                processor.save_processed_data(X, y, output_dir=str(PROCESSED_DATA_DIR))
+    elif STREAMING_OUTPUT:
+        processor.scan_directories()
+        # Satırlar geldikçe diske yazılır; yarıda kalan çalıştırma kaldığı yerden devam eder
+        n_rows = processor.process_files_streaming(output_dir=str(PROCESSED_DATA_DIR))
+    else:
+        processor.scan_directories()
+        X, y = processor.process_files_parallel()
+        n_rows = X.shape[0]
+        if n_rows > 0:
+            processor.save_processed_data(X, y, output_dir=str(PROCESSED_DATA_DIR))
+    if n_rows > 0:
         print("--- Veri İşleme Aşaması Tamamlandı ---")
     else:
         print("İşlenecek veri bulunamadı.")
@@ -0,0 +1,99 @@
+"""
+Yüzdelik (Quantile) Sketch'i
+KLL sketch'i: seri chunk'lar halinde eklenir, bellekte yalnızca ~3k değer tutulur ve sketch'ler birleştirilebilir.
+Sıra (rank) hatası k ile ters orantılıdır; benchmark.py kesin np.percentile yoluna karşı hatayı ve süreyi ölçer.
+"""
+import numpy as np
+from typing import Sequence
+
+# Her seviye, bir üst seviyenin kapasitesinin bu oranı kadar değer tutar (KLL makalesindeki c)
+CAPACITY_RATIO = 2 / 3
+MIN_CAPACITY = 2
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty); level h holds items of weight 2**h.
+
+    A full level is sorted and every other item (random offset) moves up one level, so memory stays bounded while
+    rank error grows only with the number of compactions. The coin flips come from a seeded generator, which makes
+    the result for a given input and chunking reproducible (training and inference see the same values).
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        if k < MIN_CAPACITY: raise ValueError(f"Sketch size k must be at least {MIN_CAPACITY}.")
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * CAPACITY_RATIO ** depth)), MIN_CAPACITY)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels): self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # Tek sayıda değer varsa biri bu seviyede kalır, kalan çiftlerin yarısı (ağırlık x2) yukarı taşınır
+            keep, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[int(self._rng.integers(2))::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Yeni seviye eklendiyse alt seviyelerin kapasitesi küçülür; baştan kontrol edilir
+            level = 0
+
+    def update(self, values: np.ndarray) -> 'KLLSketch':
+        """Add a chunk of (NaN-free) values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0: return self
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Sketch of both inputs (k of self); neither argument is modified"""
+        merged = self.copy()
+        for level, items in enumerate(other.levels):
+            if level == len(merged.levels): merged.levels.append(np.empty(0))
+            merged.levels[level] = np.concatenate([merged.levels[level], items])
+        merged.n += other.n
+        merged._compress()
+        return merged
+
+    def copy(self) -> 'KLLSketch':
+        clone = KLLSketch(self.k)
+        clone.n = self.n
+        clone.levels = [items.copy() for items in self.levels]
+        clone._rng.bit_generator.state = self._rng.bit_generator.state
+        return clone
+
+    @property
+    def retained(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    @property
+    def is_exact(self) -> bool:
+        """True while nothing has been compacted (every input value is still held with weight 1)"""
+        return self.retained == self.n
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Approximate quantiles for qs in [0, 1]; exact (np.percentile, linear interpolation) while is_exact"""
+        if self.n == 0: raise ValueError("Quantiles of an empty sketch are undefined.")
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.is_exact:
+            return np.percentile(self.levels[0], qs * 100)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        # q'nun sırasına ilk ulaşan değer
+        index = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        return items[np.minimum(index, len(items) - 1)]
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
@@ -0,0 +1,93 @@
+"""
+Time Series Stationarity Classification - Rolling Window Statistics
+O(n) rolling mean/std kernels without Python-level loops
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Tuple
+
+from config import ROLLING_STAT_METHOD, ROLLING_BLOCK_SIZE
+
+# Pencere içi ham ikinci momentin varyansa oranı bu sınırı aşarsa (iptal hatası ~eps * oran) pencere kesin yoldan hesaplanır
+CANCELLATION_LIMIT = 1e6
+
+
+def _block_prefix_sums(values: np.ndarray, block: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Inclusive/exclusive prefix sums along the last axis that restart every `block` samples, plus per-block totals"""
+    length = values.shape[-1]
+    n_blocks = -(-length // block)
+    padded = np.zeros(values.shape[:-1] + (n_blocks * block,), dtype=np.float64)
+    padded[..., :length] = values
+    inclusive = np.cumsum(padded.reshape(values.shape[:-1] + (n_blocks, block)), axis=-1)
+    exclusive = np.zeros_like(inclusive)
+    exclusive[..., 1:] = inclusive[..., :-1]
+    flat_shape = values.shape[:-1] + (n_blocks * block,)
+    return inclusive.reshape(flat_shape), exclusive.reshape(flat_shape), inclusive[..., -1]
+
+
+def _block_means(data: np.ndarray, block: int) -> np.ndarray:
+    """Mean of every `block`-sample block along the last axis (the last block may be shorter)"""
+    length = data.shape[-1]
+    starts = np.arange(0, length, block)
+    return np.add.reduceat(data, starts, axis=-1) / np.diff(np.append(starts, length))
+
+
+def _cumsum_mean_std(data: np.ndarray, window: int, block: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling mean/std from block-local prefix sums.
+
+    Every block is centred on its own mean before the sums are taken, so the cancellation in Q - S^2/w depends on
+    the spread inside a block instead of the level of the whole chunk. A window spans at most two blocks
+    (block >= window); its tail part is moved onto the first block's centre with the shift difference d.
+    """
+    length = data.shape[-1]
+    shifts = _block_means(data, block)
+    centered = data - np.repeat(shifts, block, axis=-1)[..., :length]
+    inc_s, exc_s, tot_s = _block_prefix_sums(centered, block)
+    inc_q, exc_q, tot_q = _block_prefix_sums(centered * centered, block)
+
+    starts = np.arange(length - window + 1)
+    ends = starts + window - 1
+    start_blocks, end_blocks = starts // block, ends // block
+    same_block = start_blocks == end_blocks
+    # Baştaki bloğun kalanı (A) + sondaki bloğun başı (B); aynı bloktaysa yalnızca A
+    sums_a = np.where(same_block, inc_s[..., ends], tot_s[..., start_blocks]) - exc_s[..., starts]
+    sq_a = np.where(same_block, inc_q[..., ends], tot_q[..., start_blocks]) - exc_q[..., starts]
+    sums_b = np.where(same_block, 0.0, inc_s[..., ends]); sq_b = np.where(same_block, 0.0, inc_q[..., ends])
+    count_b = np.where(same_block, 0, ends - end_blocks * block + 1)
+    d = shifts[..., end_blocks] - shifts[..., start_blocks]
+    sums = sums_a + sums_b + count_b * d
+    sq_sums = sq_a + sq_b + 2 * d * sums_b + count_b * d * d
+
+    local_means = sums / window
+    variances = np.maximum((sq_sums - sums * local_means) / window, 0.0)
+    means = local_means + shifts[..., start_blocks]
+    # Yerel merkezden uzak pencerelerde (ör. blok içindeki büyük seviye kayması) iptal hatası kalabilir; bunlar kesin hesaplanır.
+    # Ölçek, birbirini götüren terimlerin büyüklüğüdür (kaydırma sonrası toplam değil)
+    magnitude = (sq_a + sq_b + count_b * d * d) / window
+    unstable = np.nonzero(magnitude > CANCELLATION_LIMIT * variances)
+    if len(unstable[0]):
+        windows = sliding_window_view(data, window, axis=-1)
+        # Geçici kopya, bir seferde en fazla block pencere ile sınırlı
+        for start in range(0, len(unstable[0]), block):
+            index = tuple(axis_index[start:start + block] for axis_index in unstable)
+            exact = windows[index]
+            means[index] = exact.mean(axis=-1); variances[index] = exact.var(axis=-1)
+    return means, np.sqrt(variances)
+
+
+def rolling_mean_std(data: np.ndarray, window: int, method: str = ROLLING_STAT_METHOD) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling means and population stds of every full window along the last axis (1-D series or (N, L) batches)"""
+    data = np.asarray(data, dtype=np.float64)
+    if window < 1 or window > data.shape[-1]:
+        empty = np.empty(data.shape[:-1] + (0,))
+        return empty, empty.copy()
+
+    if method == 'strided':
+        # Kesin sonuç ve Python döngüsü yok, ancak std için (n-w+1, w) boyutlu geçici dizi oluşur
+        windows = sliding_window_view(data, window, axis=-1)
+        return windows.mean(axis=-1), windows.std(axis=-1)
+    if method != 'cumsum':
+        raise ValueError(f"Unknown rolling statistics method: {method}")
+
+    return _cumsum_mean_std(data, window, max(window, ROLLING_BLOCK_SIZE))
+
@@ -0,0 +1,162 @@
+"""
+Time Series Stationarity Classification - Columnar Shards
+One-time conversion of the raw CSV corpus into a few large shards that later runs read through memory maps.
+
+Each shard directory holds values.npy (all series concatenated, float64, NaN kept), offsets.npy (int64, n + 1 entries;
+series i is values[offsets[i]:offsets[i + 1]]), labels.npy (int64) and sources.txt (one source path per line).
+Kullanım: python shards.py
+"""
+import os
+import json
+import time
+import shutil
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+from tqdm import tqdm
+
+from config import DATA_PATH, SHARD_DIR, SHARD_MAX_BYTES, N_WORKERS, CSV_READER_ENGINE, CSV_READER_DTYPE
+from csv_readers import read_data_column
+
+SHARD_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def _read_series(args) -> Optional[np.ndarray]:
+    file_path, engine, dtype = args
+    try:
+        return np.asarray(read_data_column(file_path, engine, dtype), dtype=np.float64)
+    except Exception:
+        return None
+
+
+class Shard:
+    """Read-only view of one shard; series are slices of a single memory-mapped buffer"""
+
+    def __init__(self, shard_dir: Path):
+        self.shard_dir = Path(shard_dir)
+        self.values = np.load(self.shard_dir / 'values.npy', mmap_mode='r')
+        self.offsets = np.load(self.shard_dir / 'offsets.npy')
+        self.labels = np.load(self.shard_dir / 'labels.npy')
+        with open(self.shard_dir / 'sources.txt', 'r', encoding='utf-8') as f:
+            self.sources = [line.rstrip('\n') for line in f]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def series(self, index: int) -> np.ndarray:
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[Tuple[str, int, np.ndarray]]:
+        for i in range(len(self)):
+            yield self.sources[i], int(self.labels[i]), self.series(i)
+
+
+class ShardWriter:
+    """Buffers series in memory and writes a new shard whenever max_bytes of values have accumulated"""
+
+    def __init__(self, output_dir: Path, max_bytes: int = SHARD_MAX_BYTES):
+        self.output_dir = Path(output_dir)
+        self.max_bytes = max_bytes
+        self.shards = []
+        self._reset()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _reset(self):
+        self._values, self._labels, self._sources, self._n_values = [], [], [], 0
+
+    def append(self, values: np.ndarray, label: int, source: str):
+        self._values.append(values); self._labels.append(label); self._sources.append(source)
+        self._n_values += len(values)
+        if self._n_values * 8 >= self.max_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self._labels: return
+        name = f"shard_{len(self.shards):05d}"
+        # Yarım kalmış bir shard okunmasın diye önce geçici dizine yazılır, sonra yeniden adlandırılır
+        tmp_dir = self.output_dir / f"{name}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        offsets = np.zeros(len(self._values) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in self._values], out=offsets[1:])
+        np.save(tmp_dir / 'values.npy', np.concatenate(self._values) if self._values else np.empty(0))
+        np.save(tmp_dir / 'offsets.npy', offsets)
+        np.save(tmp_dir / 'labels.npy', np.asarray(self._labels, dtype=np.int64))
+        with open(tmp_dir / 'sources.txt', 'w', encoding='utf-8') as f:
+            f.writelines(f"{source}\n" for source in self._sources)
+        os.replace(tmp_dir, self.output_dir / name)
+        self.shards.append({'name': name, 'series': len(self._labels), 'values': int(offsets[-1])})
+        self._reset()
+
+    def close(self, metadata: dict) -> dict:
+        self.flush()
+        manifest = {'format_version': SHARD_FORMAT_VERSION, 'shards': self.shards, 'created': time.time(), **metadata}
+        with open(self.output_dir / MANIFEST_FILENAME, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def convert_to_shards(files: List[Tuple[Path, int]], output_dir: Path = SHARD_DIR, max_bytes: int = SHARD_MAX_BYTES,
+                      engine: str = CSV_READER_ENGINE, dtype: str = CSV_READER_DTYPE) -> dict:
+    """Parse every CSV once (in a process pool) and pack the series into shards; unreadable files are skipped"""
+    from processor import available_cpus
+    output_dir = Path(output_dir)
+    # Önceki dönüşüm tamamen silinir; manifest olmadan yarım kalan dönüşüm de geçersiz sayılır
+    if (output_dir / MANIFEST_FILENAME).exists():
+        os.remove(output_dir / MANIFEST_FILENAME)
+    for old_shard in output_dir.glob('shard_*'):
+        shutil.rmtree(old_shard)
+    writer = ShardWriter(output_dir, max_bytes)
+    skipped = 0
+    n_workers = max(1, min(N_WORKERS or available_cpus(), len(files)))
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        # map sırayı korur; shard içeriği dosya listesinin sırasıyla aynıdır
+        results = executor.map(_read_series, [(fp, engine, dtype) for fp, _ in files], chunksize=64)
+        for (file_path, label), values in tqdm(zip(files, results), total=len(files), desc="Converting to shards"):
+            if values is None:
+                skipped += 1
+                continue
+            writer.append(values, label, str(file_path))
+    manifest = writer.close({'source_files': len(files), 'skipped_files': skipped, 'csv_engine': engine, 'csv_dtype': dtype})
+    print(f"Wrote {sum(s['series'] for s in manifest['shards'])} series into {len(manifest['shards'])} shards at {output_dir}"
+          + (f" ({skipped} unreadable files skipped)" if skipped else ""))
+    return manifest
+
+
+_OPEN_SHARDS = {}
+
+
+def get_shard(shard_dir: str) -> Shard:
+    """Shard opened once per process (pool workers reuse the memory map across tasks)"""
+    if shard_dir not in _OPEN_SHARDS:
+        _OPEN_SHARDS[shard_dir] = Shard(Path(shard_dir))
+    return _OPEN_SHARDS[shard_dir]
+
+
+def load_manifest(shard_dir: Path = SHARD_DIR) -> Optional[dict]:
+    path = Path(shard_dir) / MANIFEST_FILENAME
+    if not path.exists(): return None
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('format_version') == SHARD_FORMAT_VERSION else None
+
+
+def open_shards(shard_dir: Path = SHARD_DIR) -> List[Shard]:
+    manifest = load_manifest(shard_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No shard manifest found in {shard_dir}. Run 'python shards.py' first.")
+    return [Shard(Path(shard_dir) / entry['name']) for entry in manifest['shards']]
+
+
+def run_conversion():
+    from processor import TimeSeriesDataProcessor
+    print("--- Shard Dönüşümü Başladı ---")
+    processor = TimeSeriesDataProcessor(base_path=DATA_PATH)
+    processor.scan_directories()
+    convert_to_shards(processor._labelled_files())
+    print("--- Shard Dönüşümü Tamamlandı ---")
+
+
+if __name__ == "__main__":
+    run_conversion()
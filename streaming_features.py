@@ -0,0 +1,211 @@
+"""
+Akış (Streaming) Özellikleri
+Chunk'lar tek geçişte, sabit boyutlu ve birleştirilebilir (mergeable) yeterli istatistiklerle tüketilir:
+Chan/Pébay momentleri, fark serilerinin momentleri, otokorelasyon için gecikmeli çapraz çarpımlar ve
+chunk sınırlarını aşan tepe sayımı. Sonuç chunk sınırlarından bağımsız, tüm seri için kesin özelliklerdir.
+İsteğe bağlı KLL sketch'i (quantile_sketch.py) tüm seri yüzdeliklerini sınırlı hatayla ekler.
+"""
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from quantile_sketch import KLLSketch
+
+# Tüm seri özellikleri; isimler chunk-toplam özellikleriyle karışmasın diye 'series_' önekini taşır
+SERIES_FEATURE_NAMES = (
+    'series_mean', 'series_std', 'series_var', 'series_min', 'series_max', 'series_range',
+    'series_skewness', 'series_kurtosis', 'series_cv',
+    'series_diff1_mean', 'series_diff1_std', 'series_diff1_var', 'series_diff2_mean', 'series_diff2_std',
+    'series_autocorr_lag1', 'series_autocorr_lag10', 'series_num_peaks',
+)
+# Sketch etkinse SERIES_FEATURE_NAMES'in ardından gelen yüzdelik özellikleri
+SERIES_QUANTILE_NAMES = ('series_q25', 'series_median', 'series_q75', 'series_iqr')
+
+LAGS = (1, 10)
+EDGE = max(LAGS)  # Her segmentin başından ve sonundan saklanan değer sayısı
+
+
+class Moments:
+    """Count, mean and central moment sums M2..M4 of a sample; merge() combines two samples exactly (Chan / Pébay)"""
+
+    __slots__ = ('n', 'mean', 'm2', 'm3', 'm4')
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0, m3: float = 0.0, m4: float = 0.0):
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> 'Moments':
+        n = len(values)
+        if n == 0: return cls()
+        mean = float(np.mean(values)); dev = values - mean; dev2 = dev * dev
+        return cls(n, mean, float(np.sum(dev2)), float(np.sum(dev2 * dev)), float(np.sum(dev2 * dev2)))
+
+    def merge(self, other: 'Moments') -> 'Moments':
+        if other.n == 0: return Moments(self.n, self.mean, self.m2, self.m3, self.m4)
+        if self.n == 0: return Moments(other.n, other.mean, other.m2, other.m3, other.m4)
+        na, nb = self.n, other.n; n = na + nb
+        delta = other.mean - self.mean; delta_n = delta / n
+        mean = self.mean + delta_n * nb
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+        m3 = (self.m3 + other.m3 + delta * delta_n * delta_n * na * nb * (na - nb)
+              + 3 * delta_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4 + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * delta_n * delta_n * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * delta_n * (na * other.m3 - nb * self.m3))
+        return Moments(n, mean, m2, m3, m4)
+
+    @property
+    def var(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+
+def _count_peaks(values: np.ndarray) -> int:
+    if len(values) < 3: return 0
+    center = values[1:-1]
+    return int(np.count_nonzero((center > values[:-2]) & (center > values[2:])))
+
+
+class SeriesAccumulator:
+    """Mergeable O(1)-state summary of a series segment.
+
+    update() appends the next chunk; merge() joins two adjacent segments (self first). Boundary terms (differences,
+    lagged products and peaks that straddle two segments) are recovered from the first/last EDGE values kept per
+    segment. Lagged products are stored around a per-segment shift to limit cancellation on series with a large level.
+    With quantile_sketch_k set, a KLLSketch of that size is fed the same chunks and adds the SERIES_QUANTILE_NAMES.
+    """
+
+    def __init__(self, quantile_sketch_k: Optional[int] = None):
+        self.moments = Moments(); self.diff1 = Moments(); self.diff2 = Moments()
+        self.minimum, self.maximum = np.inf, -np.inf
+        self.head = np.empty(0); self.tail = np.empty(0)
+        self.shift = 0.0
+        self.lag_products = {lag: 0.0 for lag in LAGS}
+        self.num_peaks = 0
+        self.sketch = KLLSketch(quantile_sketch_k) if quantile_sketch_k else None
+
+    @property
+    def n(self) -> int:
+        return self.moments.n
+
+    @classmethod
+    def from_chunk(cls, values: np.ndarray) -> 'SeriesAccumulator':
+        values = np.asarray(values, dtype=np.float64)
+        acc = cls()
+        if len(values) == 0: return acc
+        acc.moments = Moments.from_values(values)
+        diff1 = values[1:] - values[:-1]
+        acc.diff1 = Moments.from_values(diff1); acc.diff2 = Moments.from_values(diff1[1:] - diff1[:-1])
+        acc.minimum, acc.maximum = float(np.min(values)), float(np.max(values))
+        acc.head, acc.tail = values[:EDGE].copy(), values[-EDGE:].copy()
+        acc.shift = float(values[0])
+        shifted = values - acc.shift
+        acc.lag_products = {lag: float(np.dot(shifted[:-lag], shifted[lag:])) if lag < len(values) else 0.0 for lag in LAGS}
+        acc.num_peaks = _count_peaks(values)
+        return acc
+
+    def _shifted_edge_sums(self, lag: int) -> Tuple[float, float]:
+        """Sums of (x - shift) over x[:n-lag] and x[lag:] (the two factors of the lag-`lag` products)"""
+        total = self.n * (self.moments.mean - self.shift)
+        return total - float(np.sum(self.tail[len(self.tail) - lag:] - self.shift)), total - float(np.sum(self.head[:lag] - self.shift))
+
+    def _rebased_lag_products(self, shift: float) -> Dict[int, float]:
+        """Lag products re-expressed around another shift: sum (y_t + d)(y_t+k + d) with d = self.shift - shift"""
+        d = self.shift - shift
+        rebased = {}
+        for lag in LAGS:
+            if self.n <= lag:
+                rebased[lag] = 0.0
+                continue
+            first, second = self._shifted_edge_sums(lag)
+            rebased[lag] = self.lag_products[lag] + d * (first + second) + (self.n - lag) * d * d
+        return rebased
+
+    def merge(self, other: 'SeriesAccumulator') -> 'SeriesAccumulator':
+        if other.n == 0: return self.copy()
+        if self.n == 0: return other.copy()
+        merged = SeriesAccumulator()
+        merged.moments = self.moments.merge(other.moments)
+        merged.minimum, merged.maximum = min(self.minimum, other.minimum), max(self.maximum, other.maximum)
+        merged.shift = self.shift
+        # Sınır penceresi: solun son EDGE değeri + sağın ilk EDGE değeri
+        window = np.concatenate([self.tail, other.head]); split = len(self.tail)
+        cross_diff1 = window[split:split + 1] - window[split - 1:split]
+        near = window[max(split - 2, 0):split + 2]
+        near_diff1 = near[1:] - near[:-1]
+        merged.diff1 = self.diff1.merge(other.diff1).merge(Moments.from_values(cross_diff1))
+        merged.diff2 = self.diff2.merge(other.diff2).merge(Moments.from_values(near_diff1[1:] - near_diff1[:-1]))
+        merged.num_peaks = self.num_peaks + other.num_peaks + _count_peaks(near)
+
+        other_products = other._rebased_lag_products(self.shift)
+        shifted_window = window - self.shift
+        for lag in LAGS:
+            # Sınırı aşan çiftler: soldaki i, sağdaki i + lag
+            left = np.arange(max(split - lag, 0), split); right = left + lag
+            valid = right < len(window)
+            cross = float(np.dot(shifted_window[left[valid]], shifted_window[right[valid]]))
+            merged.lag_products[lag] = self.lag_products[lag] + other_products[lag] + cross
+
+        merged.head = window[:EDGE].copy() if self.n < EDGE else self.head.copy()
+        merged.tail = window[-EDGE:].copy() if other.n < EDGE else other.tail.copy()
+        if self.sketch is not None and other.sketch is not None: merged.sketch = self.sketch.merge(other.sketch)
+        return merged
+
+    def update(self, values: np.ndarray) -> 'SeriesAccumulator':
+        """Append the next chunk in place"""
+        sketch = self.sketch
+        self.__dict__.update(self.merge(SeriesAccumulator.from_chunk(values)).__dict__)
+        if sketch is not None: sketch.update(values)
+        self.sketch = sketch
+        return self
+
+    def copy(self) -> 'SeriesAccumulator':
+        clone = SeriesAccumulator()
+        clone.moments, clone.diff1, clone.diff2 = (Moments().merge(m) for m in (self.moments, self.diff1, self.diff2))
+        clone.minimum, clone.maximum, clone.shift, clone.num_peaks = self.minimum, self.maximum, self.shift, self.num_peaks
+        clone.head, clone.tail = self.head.copy(), self.tail.copy()
+        clone.lag_products = dict(self.lag_products)
+        clone.sketch = self.sketch.copy() if self.sketch is not None else None
+        return clone
+
+    def _autocorrelation(self, lag: int) -> float:
+        n = self.n; c0 = self.moments.var
+        if lag >= n or lag < 1 or c0 == 0: return 0.0
+        if n <= EDGE:
+            # Kısa seri tamamen head içinde: doğrudan hesap
+            dev = self.head - self.moments.mean
+            return float(np.sum(dev[:-lag] * dev[lag:]) / n / c0)
+        if lag not in self.lag_products:
+            raise ValueError(f"Lag {lag} is not tracked (tracked lags: {LAGS}).")
+        first, second = self._shifted_edge_sums(lag)
+        mean_shifted = self.moments.mean - self.shift
+        ck = (self.lag_products[lag] - mean_shifted * (first + second) + (n - lag) * mean_shifted * mean_shifted) / n
+        return float(ck / c0)
+
+    def features(self) -> Dict[str, float]:
+        """Whole-series features, same definitions as the per-chunk kernel in processor.py"""
+        n = self.n
+        if n < 2: raise ValueError("Series need at least two samples.")
+        moments = self.moments; var = moments.var; std = np.sqrt(var)
+        skewness = kurtosis = 0.0
+        if std != 0:
+            # processor: z = dev / std (popülasyon), skew = n/((n-1)(n-2)) * sum(z^3)
+            if n >= 3: skewness = (n / ((n - 1) * (n - 2))) * moments.m3 / std ** 3
+            if n >= 4: kurtosis = (n * (n + 1) / ((n - 1) * (n - 2) * (n - 3))) * moments.m4 / var ** 2 - (3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        values = {
+            'series_mean': moments.mean, 'series_std': std, 'series_var': var,
+            'series_min': self.minimum, 'series_max': self.maximum, 'series_range': self.maximum - self.minimum,
+            'series_skewness': skewness, 'series_kurtosis': kurtosis, 'series_cv': std / (moments.mean + 1e-10),
+            'series_diff1_mean': self.diff1.mean, 'series_diff1_std': np.sqrt(self.diff1.var), 'series_diff1_var': self.diff1.var,
+            'series_diff2_mean': self.diff2.mean, 'series_diff2_std': np.sqrt(self.diff2.var),
+            'series_autocorr_lag1': self._autocorrelation(1), 'series_autocorr_lag10': self._autocorrelation(min(10, n - 1)),
+            'series_num_peaks': float(self.num_peaks),
+        }
+        names = SERIES_FEATURE_NAMES
+        if self.sketch is not None:
+            q25, median, q75 = self.sketch.quantiles([0.25, 0.5, 0.75])
+            values.update({'series_q25': q25, 'series_median': median, 'series_q75': q75, 'series_iqr': q75 - q25})
+            names += SERIES_QUANTILE_NAMES
+        return {name: float(values[name]) for name in names}
+
+    def feature_vector(self) -> np.ndarray:
+        return np.array(list(self.features().values()))
+
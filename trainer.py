@@ -5,7 +5,6 @@ Fast and efficient model training with multiple algorithms
 
 import numpy as np
 import pandas as pd
-import pickle
 import json
 import os
 import time
@@ -31,32 +30,46 @@ import seaborn as sns
 from tqdm import tqdm
 import joblib
 import gc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from threadpoolctl import threadpool_limits
 
 # Proje konfigürasyonlarını import et
 from config import (PROCESSED_DATA_DIR, TRAINED_MODELS_DIR, REPORTS_DIR,
-                    TEST_SIZE, FEATURE_SELECTION_K, CROSS_VALIDATION_FOLDS)
+                    TEST_SIZE, FEATURE_SELECTION_K, CROSS_VALIDATION_FOLDS,
+                    OUT_OF_CORE_TRAINING, PREPROCESS_FIT_SAMPLE_SIZE, TRAINING_BLOCK_ROWS,
+                    PARALLEL_MODEL_TRAINING, TRAINING_CPU_BUDGET, DECISION_THRESHOLDS)
+from processor import available_cpus, required_base_features, FEATURE_EXTRACTOR_VERSION, FEATURE_PLAN_FILENAME
+from preprocessing import FusedPreprocessor, PREPROCESSING_FILENAME
+from feature_schema import FEATURE_NAMES_FILENAME, load_feature_names
 
 class StationarityModelTrainer:
     """Train multiple models for stationarity classification"""
     
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, out_of_core: bool = OUT_OF_CORE_TRAINING):
         self.data_dir = data_dir
+        self.out_of_core = out_of_core
         self.models = {}
         self.scalers = {}
         self.results = {}
         self.best_model = None
         self.feature_names = None
+        self.feature_schema_version = None
         
     def load_data(self) -> Tuple[np.ndarray, np.ndarray]:
         """Load processed features and labels"""
-        print("Loading processed data...")
-        X = np.load(os.path.join(self.data_dir, 'features.npy'))
+        print("Loading processed data..." + (" (memory-mapped)" if self.out_of_core else ""))
+        # Out-of-core modda özellik matrisi belleğe alınmaz, sayfalar gerektikçe diskten okunur
+        X = np.load(os.path.join(self.data_dir, 'features.npy'), mmap_mode='r' if self.out_of_core else None)
         y = np.load(os.path.join(self.data_dir, 'labels.npy'))
         
-        feature_names_path = os.path.join(self.data_dir, 'feature_names.json')
+        feature_names_path = os.path.join(self.data_dir, FEATURE_NAMES_FILENAME)
         if os.path.exists(feature_names_path):
-            with open(feature_names_path, 'r') as f:
-                self.feature_names = json.load(f)
+            schema = load_feature_names(feature_names_path)
+            self.feature_names, self.feature_schema_version = schema['names'], schema['schema_version']
+            if self.feature_schema_version != FEATURE_EXTRACTOR_VERSION or len(self.feature_names) != X.shape[1]:
+                print(f"Warning: features were written with schema version {self.feature_schema_version} "
+                      f"({len(self.feature_names)} columns), current extractor is version {FEATURE_EXTRACTOR_VERSION}. Reprocess the data.")
         
         print(f"Loaded data shape: X={X.shape}, y={y.shape}")
         print(f"Class distribution: {np.bincount(y)}")
@@ -92,7 +105,8 @@ class StationarityModelTrainer:
             'mlp_fast': MLPClassifier(hidden_layer_sizes=(100, 50), max_iter=500, early_stopping=True, random_state=42)
         }
     
-    def train_single_model(self, model, X_train, y_train, X_val, y_val, model_name: str) -> Dict:
+    @staticmethod
+    def train_single_model(model, X_train, y_train, X_val, y_val, model_name: str) -> Dict:
         """Train a single model and evaluate"""
         print(f"\nTraining {model_name}...")
         start_time = time.time()
@@ -118,33 +132,137 @@ class StationarityModelTrainer:
         print(f"{model_name} -> Val Acc: {results['val_accuracy']:.4f}, F1: {results['val_f1']:.4f}, Time: {train_time:.2f}s")
         return results
     
-    def train_all_models(self, X: np.ndarray, y: np.ndarray, test_size: float, k_features: int):
-        """Train all models and compare results"""
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+    def _fit_sample(self, indices: np.ndarray, seed: int = 42) -> np.ndarray:
+        """Sorted random subset of `indices` (at most PREPROCESS_FIT_SAMPLE_SIZE) used to fit scaler/selector"""
+        if len(indices) <= PREPROCESS_FIT_SAMPLE_SIZE: return np.sort(indices)
+        rng = np.random.default_rng(seed)
+        return np.sort(rng.choice(indices, size=PREPROCESS_FIT_SAMPLE_SIZE, replace=False))
+    
+    def _gather_transform(self, X: np.ndarray, indices: np.ndarray, scaler, selector) -> np.ndarray:
+        """Scale/select X[indices] block by block into one preallocated matrix, keeping the order of `indices`"""
+        # Seçilmeyen sütunlar ölçeklenmez: mümkünse birleşik gather + scale kullanılır
+        fused = FusedPreprocessor.from_transformers(scaler, selector)
+        out = None
+        for start in range(0, len(indices), TRAINING_BLOCK_ROWS):
+            block_indices = indices[start:start + TRAINING_BLOCK_ROWS]
+            # Memmap'ten sıralı indekslerle okumak rastgele erişimden çok daha hızlıdır; sonra orijinal sıraya dönülür
+            order = np.argsort(block_indices)
+            rows = np.empty((len(block_indices), X.shape[1]))
+            rows[order] = X[block_indices[order]]
+            if fused is not None:
+                block = fused.transform(rows)
+            else:
+                block = scaler.transform(rows)
+                if selector is not None: block = selector.transform(block)
+            if out is None: out = np.empty((len(indices), block.shape[1]))
+            out[start:start + len(block_indices)] = block
+        return out
+    
+    def prepare_out_of_core(self, X: np.ndarray, y: np.ndarray, test_size: float, k_features: int) -> Tuple[np.ndarray, ...]:
+        """Index-based split, scaler/selector fit on a row sample, selected matrices built blockwise"""
+        train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=test_size, random_state=42, stratify=y)
+        y_train, y_test = y[train_idx], y[test_idx]
         
-        X_train_scaled, scaler = self.preprocess_features(X_train, method='robust')
-        X_test_scaled = scaler.transform(X_test)
+        sample_idx = self._fit_sample(train_idx)
+        print(f"Fitting scaler/selector on {len(sample_idx)} of {len(train_idx)} training rows.")
+        X_sample = np.asarray(X[sample_idx], dtype=np.float64)
+        X_sample_scaled, scaler = self.preprocess_features(X_sample, method='robust')
         self.scalers['main'] = scaler
         
-        if X_train.shape[1] > k_features:
+        selector = None
+        if X.shape[1] > k_features:
             print(f"Performing feature selection to keep best {k_features} features.")
-            X_train_selected, selector = self.feature_selection(X_train_scaled, y_train, method='kbest', k=k_features)
-            X_test_selected = selector.transform(X_test_scaled)
+            _, selector = self.feature_selection(X_sample_scaled, y[sample_idx], method='kbest', k=k_features)
             self.scalers['selector'] = selector
-        else:
-            X_train_selected, X_test_selected = X_train_scaled, X_test_scaled
+        del X_sample, X_sample_scaled
+        gc.collect()
         
-        models_dict = self.get_fast_models()
+        X_train_selected = self._gather_transform(X, train_idx, scaler, selector)
+        X_test_selected = self._gather_transform(X, test_idx, scaler, selector)
+        return X_train_selected, X_test_selected, y_train, y_test
+    
+    def plan_cpu_budget(self, models_dict: Dict, cpu_budget: int) -> Dict[str, int]:
+        """Threads per model: one core for each single-threaded model, the rest shared by n_jobs=-1 models"""
+        multi_threaded = [name for name, model in models_dict.items() if 'n_jobs' in model.get_params()]
+        single_threaded = len(models_dict) - len(multi_threaded)
+        threads = max(1, (cpu_budget - single_threaded) // max(1, len(multi_threaded)))
+        return {name: threads if name in multi_threaded else 1 for name in models_dict}
+    
+    def _train_models_parallel(self, models_dict: Dict, X_train, y_train, X_val, y_val) -> list:
+        """Fit independent models concurrently in a process pool and collect each result as soon as it finishes"""
+        cpu_budget = TRAINING_CPU_BUDGET or available_cpus()
+        threads = self.plan_cpu_budget(models_dict, cpu_budget)
+        for model_name, model in models_dict.items():
+            if 'n_jobs' in model.get_params(): model.set_params(n_jobs=threads[model_name])
+        n_workers = min(len(models_dict), cpu_budget)
+        print(f"Training {len(models_dict)} models in parallel with {n_workers} workers (CPU budget {cpu_budget}).")
+        
+        # Matrisler paylaşımlı belleğe bir kez kopyalanır; işçilere sadece (ad, şekil, dtype) gönderilir
+        shared, handles = [], []
+        try:
+            for array in (X_train, y_train, X_val, y_val):
+                descriptor, handle = SharedMatrix.create(array)
+                shared.append(descriptor); handles.append(handle)
+            
+            finished = {}
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = {executor.submit(_train_model_task, model_name, model, threads[model_name], *shared): model_name
+                           for model_name, model in models_dict.items()}
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Training Models"):
+                    model_name = futures[future]
+                    try:
+                        model, results = future.result()
+                    except Exception as e:
+                        print(f"Error training {model_name}: {e}")
+                        continue
+                    finished[model_name] = (model, results)
+        finally:
+            for handle in handles:
+                handle.close(); handle.unlink()
+        
+        # Sonuçlar model sözlüğü sırasıyla kaydedilir, böylece en iyi model seçimi sıralı eğitimle aynı kalır
         all_results = []
-        for model_name, model in tqdm(models_dict.items(), desc="Training Models"):
-            try:
-                results = self.train_single_model(model, X_train_selected, y_train, X_test_selected, y_test, model_name)
-                all_results.append(results)
+        for model_name in models_dict:
+            if model_name in finished:
+                model, results = finished[model_name]
                 self.models[model_name] = model
                 self.results[model_name] = results
-            except Exception as e:
-                print(f"Error training {model_name}: {e}")
-            gc.collect()
+                all_results.append(results)
+        return all_results
+    
+    def train_all_models(self, X: np.ndarray, y: np.ndarray, test_size: float, k_features: int):
+        """Train all models and compare results"""
+        if self.out_of_core:
+            X_train_selected, X_test_selected, y_train, y_test = self.prepare_out_of_core(X, y, test_size, k_features)
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+            
+            X_train_scaled, scaler = self.preprocess_features(X_train, method='robust')
+            X_test_scaled = scaler.transform(X_test)
+            self.scalers['main'] = scaler
+            
+            if X_train.shape[1] > k_features:
+                print(f"Performing feature selection to keep best {k_features} features.")
+                X_train_selected, selector = self.feature_selection(X_train_scaled, y_train, method='kbest', k=k_features)
+                X_test_selected = selector.transform(X_test_scaled)
+                self.scalers['selector'] = selector
+            else:
+                X_train_selected, X_test_selected = X_train_scaled, X_test_scaled
+        
+        models_dict = self.get_fast_models()
+        all_results = []
+        if PARALLEL_MODEL_TRAINING and len(models_dict) > 1:
+            all_results = self._train_models_parallel(models_dict, X_train_selected, y_train, X_test_selected, y_test)
+        else:
+            for model_name, model in tqdm(models_dict.items(), desc="Training Models"):
+                try:
+                    results = self.train_single_model(model, X_train_selected, y_train, X_test_selected, y_test, model_name)
+                    all_results.append(results)
+                    self.models[model_name] = model
+                    self.results[model_name] = results
+                except Exception as e:
+                    print(f"Error training {model_name}: {e}")
+                gc.collect()
         
         best_f1 = -1
         if all_results:
@@ -164,6 +282,10 @@ class StationarityModelTrainer:
             return
         
         print(f"\nCross-validating {self.best_model}...")
+        if self.out_of_core:
+            # Tüm matrisi belleğe almamak için çapraz doğrulama bir satır örneği üzerinde yapılır
+            sample_idx = self._fit_sample(np.arange(len(y)), seed=0)
+            X, y = np.asarray(X[sample_idx], dtype=np.float64), y[sample_idx]
         X_scaled, _ = self.preprocess_features(X, method='robust')
         model = self.get_fast_models()[self.best_model]
         cv_scores = cross_val_score(model, X_scaled, y, cv=cv, scoring='f1_weighted', n_jobs=-1)
@@ -171,14 +293,37 @@ class StationarityModelTrainer:
         print(f"Mean CV F1: {np.mean(cv_scores):.4f} (+/- {np.std(cv_scores) * 2:.4f})")
         return cv_scores
     
+    def decision_thresholds(self) -> Dict[str, float]:
+        """Per-model decision thresholds stored with the models (probability of class 1, or margin for decision_function models)"""
+        thresholds = {}
+        for model_name, model in self.models.items():
+            default = 0.5 if hasattr(model, 'predict_proba') else 0.0
+            thresholds[model_name] = float(DECISION_THRESHOLDS.get(model_name, default))
+        return thresholds
+    
+    @staticmethod
+    def _dump_artifact(obj, path: str):
+        """Uncompressed joblib dump (memory-mappable) written to a temp file and renamed, so workers mapping the old file are not corrupted"""
+        tmp_path = f"{path}.tmp"
+        joblib.dump(obj, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+    
     def save_models(self, output_dir: str):
         """Save trained models and preprocessing objects"""
         os.makedirs(output_dir, exist_ok=True)
         for model_name, model in self.models.items():
-            joblib.dump(model, os.path.join(output_dir, f'{model_name}.joblib'))
-        
-        with open(os.path.join(output_dir, 'scalers.pkl'), 'wb') as f:
-            pickle.dump(self.scalers, f)
+            self._dump_artifact(model, os.path.join(output_dir, f'{model_name}.joblib'))
+        # scalers.pkl de joblib biçiminde yazılır (joblib.load eski düz pickle dosyalarını da okur)
+        self._dump_artifact(self.scalers, os.path.join(output_dir, 'scalers.pkl'))
+        # Çıkarımda scaler + selector yerine kullanılan birleşik ön işleme artefaktı
+        fused = FusedPreprocessor.from_transformers(self.scalers.get('main'), self.scalers.get('selector'))
+        if fused is not None:
+            fused.save(os.path.join(output_dir, PREPROCESSING_FILENAME))
+            # Seçilen sütunları üretmek için gereken temel özellikler; çıkarım geri kalanını hesaplamaz
+            feature_plan = {'feature_extractor_version': FEATURE_EXTRACTOR_VERSION,
+                            'required_features': required_base_features(fused.columns)}
+            with open(os.path.join(output_dir, FEATURE_PLAN_FILENAME), 'w') as f:
+                json.dump(feature_plan, f, indent=2)
         
         json_results = {}
         for key, result in self.results.items():
@@ -189,7 +334,8 @@ class StationarityModelTrainer:
         with open(os.path.join(output_dir, 'training_results.json'), 'w') as f:
             json.dump(json_results, f, indent=2)
         
-        best_model_info = {'best_model': self.best_model, 'best_f1': self.results[self.best_model]['val_f1'], 'feature_names': self.feature_names}
+        best_model_info = {'best_model': self.best_model, 'best_f1': self.results[self.best_model]['val_f1'], 'feature_names': self.feature_names,
+                           'feature_schema_version': self.feature_schema_version, 'decision_thresholds': self.decision_thresholds()}
         with open(os.path.join(output_dir, 'best_model_info.json'), 'w') as f:
             json.dump(best_model_info, f, indent=2)
         print(f"\nAll models and results saved to {output_dir}")
@@ -213,6 +359,47 @@ class StationarityModelTrainer:
         plt.show()
         print(f"Results plot saved to {save_path}")
 
+class SharedMatrix:
+    """Picklable handle to an ndarray stored in shared memory; only (name, shape, dtype) cross process boundaries"""
+    
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+    
+    @classmethod
+    def create(cls, array: np.ndarray) -> Tuple['SharedMatrix', shared_memory.SharedMemory]:
+        array = np.ascontiguousarray(array)
+        handle = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=handle.buf)[...] = array
+        return cls(handle.name, array.shape, array.dtype.str), handle
+    
+    def attach(self) -> Tuple[np.ndarray, shared_memory.SharedMemory]:
+        """Zero-copy read-only view of the shared array (keep the handle alive while the view is used)"""
+        handle = shared_memory.SharedMemory(name=self.name)
+        view = np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=handle.buf)
+        view.flags.writeable = False
+        return view, handle
+
+def _train_model_task(model_name: str, model, n_threads: int, *shared: SharedMatrix) -> Tuple[Any, Dict]:
+    """Process-pool entry point: fit/evaluate one model on shared matrices with native thread pools capped to its CPU share"""
+    attached = [matrix.attach() for matrix in shared]
+    handles = [handle for _, handle in attached]
+    try:
+        X_train, y_train, X_val, y_val = (view for view, _ in attached)
+        del attached
+        with threadpool_limits(limits=n_threads):
+            results = StationarityModelTrainer.train_single_model(model, X_train, y_train, X_val, y_val, model_name)
+        del X_train, y_train, X_val, y_val
+    finally:
+        for handle in handles:
+            try:
+                handle.close()
+            except BufferError:
+                # Model girdiye referans tutuyorsa eşleme, işçi süreci kapanana kadar açık kalır
+                pass
+    return model, results
+
 def run_training():
     """Model eğitim pipeline'ını çalıştırır."""
     print("\n--- Model Eğitimi Aşaması Başladı ---")